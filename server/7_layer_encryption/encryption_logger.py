@@ -12,9 +12,11 @@ Date: October 10, 2025
 """
 
 import os
+import atexit
 import json
 import time
 import hashlib
+import threading
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
@@ -22,10 +24,46 @@ from typing import Dict, Any, List, Optional
 class EncryptionLogger:
     """Comprehensive logger for 7-layer encryption processes"""
     
+    # Static separators, built once instead of on every log call
+    _EQ60 = '=' * 60
+    _EQ50 = '=' * 50
+    _DASH30 = '─' * 30
+    _DASH25 = '─' * 25
+    _DASH20 = '─' * 20
+    
+    # Markers counted by get_log_stats, mapped to their stats keys
+    _STAT_MARKERS = {
+        'ENCRYPTION STARTED': 'total_operations',
+        'MESSAGE ENCRYPTION STARTED': 'message_encryptions',
+        'FILE ENCRYPTION STARTED': 'file_encryptions',
+        'DECRYPTION STARTED': 'total_decryptions',
+        'SUCCESSFUL!': 'successful_operations',
+        '❌ ERROR': 'errors',
+    }
+    
+    # Layer entries are the highest-volume log lines, so bind the template once
+    _LAYER_TEMPLATE = """
+LAYER {layer_num}: {layer_name}
+{sep}
+Key:    {key}
+Input:  {input_hex} ({input_len} bytes)
+Output: {output_hex} ({output_len} bytes)
+Change: {input_len} → {output_len} ({delta:+d} bytes)
+
+"""
+    
     def __init__(self, log_file: str = "encryption_log.txt"):
         self.log_file = os.path.join(os.path.dirname(__file__), log_file)
         self.session_start = datetime.now()
         
+        # Keep one append handle for the whole session instead of reopening the
+        # file for every log line. Line buffered, so every entry reaches the
+        # file as soon as it is written and nothing is lost if the server dies
+        self._fh = open(self.log_file, 'a', encoding='utf-8', buffering=1)
+        # Request threads share this handle; keep each entry's write whole
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+        
         # Initialize log file with session header
         self._write_session_header()
     
@@ -33,11 +71,29 @@ class EncryptionLogger:
         """Write session start header to log file"""
         header = f"""
 7-LAYER ENCRYPTION SESSION - {self.session_start.strftime('%Y-%m-%d %H:%M:%S')}
-{'='*60}
+{self._EQ60}
 
 """
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(header)
+        self._write(header)
+    
+    def _write(self, entry: str):
+        """Append an entry to the log handle"""
+        with self._lock:
+            self._fh.write(entry)
+    
+    def write_entry(self, entry: str):
+        """Append a preformatted entry (e.g. the steganography layer) to the log"""
+        self._write(entry)
+    
+    def flush(self):
+        """Push buffered log entries to disk"""
+        if not self._fh.closed:
+            self._fh.flush()
+    
+    def close(self):
+        """Flush and close the log handle"""
+        if not self._fh.closed:
+            self._fh.close()
     
     def _get_timestamp(self) -> str:
         """Get formatted timestamp"""
@@ -49,12 +105,23 @@ class EncryptionLogger:
             return data
         return f"{data[:max_len//2]}...{data[-max_len//2:]}"
     
+    @staticmethod
+    def _hex_preview(data: bytes, max_len: int = 64) -> str:
+        """Hex preview of binary data, truncated like _safe_truncate(data.hex())
+        
+        Only the bytes that end up in the preview are hex-encoded, so large
+        buffers are never converted in full.
+        """
+        if len(data) * 2 <= max_len:
+            return data.hex()
+        edge = max_len // 4
+        return f"{data[:edge].hex()}...{data[-edge:].hex()}"
+    
     def _format_hex_data(self, data: bytes, name: str = "Data") -> str:
         """Format binary data as hex with metadata"""
-        hex_data = data.hex()
         return f"""   📊 {name}:
       🔢 Length: {len(data)} bytes
-      🔤 Hex: {self._safe_truncate(hex_data, 80)}
+      🔤 Hex: {self._hex_preview(data, 80)}
       #️⃣ SHA256: {hashlib.sha256(data).hexdigest()[:16]}...
 """
 
@@ -65,15 +132,14 @@ class EncryptionLogger:
         
         log_entry = f"""
 MESSAGE ENCRYPTION - {operation_id}
-{'='*50}
+{self._EQ50}
 Users: {user1} ↔ {user2}
 Message: "{original_msg}"
 Profile: {security_profile}
 
 """
         
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        self._write(log_entry)
         
         return operation_id
     
@@ -84,15 +150,14 @@ Profile: {security_profile}
         
         log_entry = f"""
 FILE ENCRYPTION - {operation_id}
-{'='*50}
+{self._EQ50}
 Users: {user1} ↔ {user2}
 File: {filename} ({file_size:,} bytes)
 Profile: {security_profile}
 
 """
         
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        self._write(log_entry)
         
         return operation_id
     
@@ -102,32 +167,36 @@ Profile: {security_profile}
         
         log_entry = f"""
 MASTER KEY GENERATION
-{'─'*25}
+{self._DASH25}
 Material: {key_material}
-Master Key: {self._safe_truncate(master_key.hex(), 64)}
+Master Key: {self._hex_preview(master_key)}
 
 """
         
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        self._write(log_entry)
     
     def log_layer_process(self, operation_id: str, layer_num: int, layer_name: str,
                          input_data: bytes, output_data: bytes, 
                          layer_key: bytes, layer_params: Dict[str, Any]):
         """Log individual layer processing details - clean format"""
         
-        log_entry = f"""
-LAYER {layer_num}: {layer_name}
-{'─'*30}
-Key:    {self._safe_truncate(layer_key.hex(), 64)}
-Input:  {self._safe_truncate(input_data.hex(), 64)} ({len(input_data)} bytes)
-Output: {self._safe_truncate(output_data.hex(), 64)} ({len(output_data)} bytes)
-Change: {len(input_data)} → {len(output_data)} ({len(output_data)-len(input_data):+d} bytes)
-
-"""
+        hex_preview = self._hex_preview
+        input_len = len(input_data)
+        output_len = len(output_data)
         
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        log_entry = self._LAYER_TEMPLATE.format(
+            layer_num=layer_num,
+            layer_name=layer_name,
+            sep=self._DASH30,
+            key=hex_preview(layer_key),
+            input_hex=hex_preview(input_data),
+            input_len=input_len,
+            output_hex=hex_preview(output_data),
+            output_len=output_len,
+            delta=output_len - input_len
+        )
+        
+        self._write(log_entry)
     
     def log_encryption_complete(self, operation_id: str, original_size: int, 
                               final_size: int, processing_time: float, 
@@ -136,17 +205,16 @@ Change: {len(input_data)} → {len(output_data)} ({len(output_data)-len(input_da
         
         log_entry = f"""
 ENCRYPTION COMPLETE
-{'─'*20}
+{self._DASH20}
 Original: {original_size} bytes → Encrypted: {final_size} bytes
 Time: {processing_time:.3f}s
 Final: {self._safe_truncate(final_result.get('encrypted_message', ''), 64)}
 
-{'='*60}
+{self._EQ60}
 
 """
         
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        self._write(log_entry)
     
     def log_decryption_start(self, operation_id: str, encrypted_data: Dict[str, Any],
                            user1: str, user2: str):
@@ -164,15 +232,14 @@ Final: {self._safe_truncate(final_result.get('encrypted_message', ''), 64)}
         
         log_entry = f"""
 ❌ ERROR - {operation_id}
-{'─'*30}
+{self._DASH30}
 ⏰ Timestamp: {self._get_timestamp()}
 🚨 Stage: {error_stage}
 💥 Error: {error_message}
 
 """
         
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        self._write(log_entry)
     
     def get_log_stats(self) -> Dict[str, Any]:
         """Get statistics about logged operations"""
@@ -180,17 +247,20 @@ Final: {self._safe_truncate(final_result.get('encrypted_message', ''), 64)}
             if not os.path.exists(self.log_file):
                 return {'total_operations': 0, 'file_size': 0}
             
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            self.flush()
+            
+            # Stream the log once with constant memory instead of reading the
+            # whole file and rescanning it per marker
+            counts = dict.fromkeys(self._STAT_MARKERS.values(), 0)
+            with open(self.log_file, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    for marker, key in self._STAT_MARKERS.items():
+                        if marker in line:
+                            counts[key] += line.count(marker)
             
             stats = {
-                'file_size': len(content),
-                'total_operations': content.count('ENCRYPTION STARTED'),
-                'message_encryptions': content.count('MESSAGE ENCRYPTION STARTED'),
-                'file_encryptions': content.count('FILE ENCRYPTION STARTED'),
-                'total_decryptions': content.count('DECRYPTION STARTED'),
-                'successful_operations': content.count('SUCCESSFUL!'),
-                'errors': content.count('❌ ERROR'),
+                'file_size': os.path.getsize(self.log_file),
+                **counts,
                 'session_start': self.session_start.strftime('%Y-%m-%d %H:%M:%S')
             }
             
@@ -18,17 +18,24 @@ Security Purpose:
 - Adds confusion layer before authenticated encryption
 
 Implementation Details:
-- Uses SHA-256 based PRNG for cryptographic quality randomness
+- Uses SHAKE-256 based PRNG for cryptographic quality randomness
 - Fisher-Yates shuffle for creating permutation table
+- Substitution applied with bytes.translate (single C-level pass, no extension build)
 - Constant-time operations to prevent timing attacks
 - Secure memory handling for key material
 """
 
+import functools
 import hashlib
 import secrets
 import struct
 from typing import Tuple
 
+import numpy as np
+
+# Number of set bits for every byte value (popcount lookup table)
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
 
 class ByteFrequencyMasker:
     """
@@ -36,16 +43,18 @@ class ByteFrequencyMasker:
     """
     
     def __init__(self):
-        self.substitution_table = [0] * 256
-        self.inverse_table = [0] * 256
+        self.substitution_table = bytes(256)
+        self.inverse_table = bytes(256)
     
-    def _generate_prng_sequence(self, seed: bytes, length: int) -> bytes:
+    @staticmethod
+    def _generate_prng_sequence(seed: bytes, length: int, legacy: bool = False) -> bytes:
         """
         Generate cryptographically secure pseudo-random sequence from seed
         
         Args:
             seed: Cryptographic seed material (32+ bytes recommended)
             length: Number of random bytes to generate
+            legacy: Use the 1.0 package format's SHA-256 counter-mode expansion
             
         Returns:
             Pseudo-random byte sequence
@@ -53,59 +62,91 @@ class ByteFrequencyMasker:
         if len(seed) < 16:
             raise ValueError("Seed must be at least 16 bytes for security")
             
-        # Use SHA-256 in counter mode for expanding seed
-        output = bytearray()
-        counter = 0
-        
-        while len(output) < length:
-            # Hash seed with counter to generate random block
-            hasher = hashlib.sha256()
-            hasher.update(seed)
-            hasher.update(struct.pack('<Q', counter))  # Little-endian 64-bit counter
-            block = hasher.digest()
-            
-            # Add block to output (may exceed length, will be truncated)
-            output.extend(block)
-            counter += 1
+        if legacy:
+            # 1.0 format: SHA-256 in counter mode, one 32-byte block per counter
+            output = bytearray()
+            counter = 0
+            while len(output) < length:
+                output.extend(hashlib.sha256(seed + struct.pack('<Q', counter)).digest())
+                counter += 1
+            return bytes(output[:length])
             
-        return bytes(output[:length])
+        # SHAKE-256 is an extendable-output function: one absorb of the seed
+        # squeezes out exactly the requested number of bytes
+        return hashlib.shake_256(seed).digest(length)
     
-    def _create_substitution_table(self, master_key: bytes, nonce: bytes) -> Tuple[list, list]:
+    def _create_substitution_table(self, master_key: bytes, nonce: bytes,
+                                   legacy: bool = False) -> Tuple[bytes, bytes]:
         """
         Create byte substitution table using Fisher-Yates shuffle
         
         Args:
             master_key: Master encryption key
             nonce: Unique nonce for this operation
+            legacy: Build the table the 1.0 package format used
             
         Returns:
-            Tuple of (substitution_table, inverse_table)
+            Tuple of (substitution_table, inverse_table) as 256-byte translate tables
         """
         # Derive seed for substitution table from key and nonce
-        seed_material = hashlib.sha256(master_key + nonce + b"BYTE_MASK_LAYER1").digest()
+        # (BLAKE2b personalization provides the layer domain separation;
+        # 1.0 packages used a SHA-256 digest with a suffix label instead)
+        if legacy:
+            seed_material = hashlib.sha256(master_key + nonce + b"BYTE_MASK_LAYER1").digest()
+        else:
+            seed_material = hashlib.blake2b(
+                master_key + nonce, digest_size=32, person=b"BMASK_L1"
+            ).digest()
+        
+        # Tables depend only on the seed, so repeated (key, nonce) pairs skip
+        # the PRNG expansion and shuffle entirely
+        return self._tables_from_seed(seed_material, legacy)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _tables_from_seed(seed_material: bytes, legacy: bool = False) -> Tuple[bytes, bytes]:
+        """
+        Build substitution and inverse tables from derived seed material
         
+        Results are cached per seed. The seed is a one-way digest of key and
+        nonce, so the cache never holds raw key material.
+        
+        Args:
+            seed_material: 32-byte seed derived from master key and nonce
+            legacy: Expand the seed with the 1.0 package format's PRNG
+            
+        Returns:
+            Tuple of (substitution_table, inverse_table) translate tables
+        """
         # Generate random bytes for Fisher-Yates shuffle
         # Need 256 random values for swapping positions
-        random_bytes = self._generate_prng_sequence(seed_material, 256 * 4)  # 4 bytes per random int
+        random_bytes = ByteFrequencyMasker._generate_prng_sequence(seed_material, 256 * 4, legacy)  # 4 bytes per random int
         
+        # Unpack all little-endian 32-bit random ints and reduce each one to its
+        # swap range [0, i] in a single vectorized step
+        random_ints = np.frombuffer(random_bytes, dtype='<u4')
+        swap_indices = (random_ints % np.arange(1, 257)).tolist()
+
         # Initialize substitution table with identity mapping
         sub_table = list(range(256))
-        
+
         # Fisher-Yates shuffle using derived randomness
         for i in range(255, 0, -1):  # Shuffle from end to beginning
             # Get random index from 0 to i (inclusive)
-            random_int = struct.unpack('<I', random_bytes[i*4:(i+1)*4])[0]
-            j = random_int % (i + 1)
-            
+            j = swap_indices[i]
+
             # Swap positions
             sub_table[i], sub_table[j] = sub_table[j], sub_table[i]
         
-        # Create inverse table for decryption
-        inv_table = [0] * 256
-        for i in range(256):
-            inv_table[sub_table[i]] = i
+        # Create inverse table for decryption (scatter each index to the
+        # position its substituted value points at)
+        sub_array = np.asarray(sub_table, dtype=np.uint8)
+        inv_array = np.empty(256, dtype=np.uint8)
+        inv_array[sub_array] = np.arange(256, dtype=np.uint8)
             
-        return sub_table, inv_table
+        # Immutable bytes tables can be shared safely by every cache hit and
+        # feed straight into bytes.translate
+        return sub_array.tobytes(), inv_array.tobytes()
     
     def encrypt(self, plaintext: bytes, master_key: bytes, nonce: bytes) -> bytes:
         """
@@ -133,13 +174,11 @@ class ByteFrequencyMasker:
         )
         
         # Apply byte substitution to flatten frequency distribution
-        masked_bytes = bytearray()
-        for byte_val in plaintext:
-            masked_bytes.append(self.substitution_table[byte_val])
-            
-        return bytes(masked_bytes)
+        # (bytes.translate remaps the whole buffer in one C pass)
+        return plaintext.translate(self.substitution_table)
     
-    def decrypt(self, ciphertext: bytes, master_key: bytes, nonce: bytes) -> bytes:
+    def decrypt(self, ciphertext: bytes, master_key: bytes, nonce: bytes,
+                legacy: bool = False) -> bytes:
         """
         Reverse byte-frequency masking from ciphertext
         
@@ -147,6 +186,7 @@ class ByteFrequencyMasker:
             ciphertext: Masked bytes to unmask
             master_key: Master encryption key (must match encryption key)
             nonce: Nonce used during encryption (must match)
+            legacy: Ciphertext comes from a 1.0-format package
             
         Returns:
             Original plaintext with frequency patterns restored
@@ -160,15 +200,11 @@ class ByteFrequencyMasker:
             
         # Regenerate same substitution table using same key and nonce
         self.substitution_table, self.inverse_table = self._create_substitution_table(
-            master_key, nonce
+            master_key, nonce, legacy
         )
         
         # Apply inverse substitution to restore original bytes
-        unmasked_bytes = bytearray()
-        for byte_val in ciphertext:
-            unmasked_bytes.append(self.inverse_table[byte_val])
-            
-        return bytes(unmasked_bytes)
+        return ciphertext.translate(self.inverse_table)
     
     def get_entropy_stats(self, data: bytes) -> dict:
         """
@@ -183,22 +219,16 @@ class ByteFrequencyMasker:
         if not data:
             return {"entropy": 0, "max_entropy": 0, "efficiency": 0}
             
-        # Count byte frequencies
-        freq_counts = [0] * 256
-        for byte_val in data:
-            freq_counts[byte_val] += 1
-            
-        # Calculate Shannon entropy
-        entropy = 0.0
-        data_len = len(data)
+        # Count byte frequencies (single-pass histogram over a uint8 view)
+        freq_counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
         
-        for count in freq_counts:
-            if count > 0:
-                probability = count / data_len
-                entropy -= probability * (probability.bit_length() - 1)  # log2 approximation
+        # Calculate Shannon entropy over the bytes that actually occur
+        data_len = len(data)
+        probabilities = freq_counts[freq_counts > 0] / data_len
+        entropy = float((probabilities * np.log2(1.0 / probabilities)).sum())
                 
         # Maximum possible entropy for this data length
-        max_entropy = min(8.0, data_len.bit_length() - 1)  # Up to 8 bits per byte
+        max_entropy = min(8.0, float(np.log2(data_len)))  # Up to 8 bits per byte
         
         # Entropy efficiency (how close to maximum randomness)
         efficiency = entropy / max_entropy if max_entropy > 0 else 0
@@ -207,7 +237,7 @@ class ByteFrequencyMasker:
             "entropy": entropy,
             "max_entropy": max_entropy,
             "efficiency": efficiency,
-            "unique_bytes": sum(1 for count in freq_counts if count > 0)
+            "unique_bytes": int(np.count_nonzero(freq_counts))
         }
     
     def test_substitution_quality(self, master_key: bytes, nonce: bytes) -> dict:
@@ -222,34 +252,30 @@ class ByteFrequencyMasker:
             Quality metrics for the substitution table
         """
         # Generate substitution table
-        sub_table, inv_table = self._create_substitution_table(master_key, nonce)
+        sub_bytes, inv_bytes = self._create_substitution_table(master_key, nonce)
+        sub_table = np.frombuffer(sub_bytes, dtype=np.uint8)
+        inv_table = np.frombuffer(inv_bytes, dtype=np.uint8)
         
         # Test 1: Ensure it's a proper permutation (bijective)
-        sorted_sub = sorted(sub_table)
-        is_permutation = sorted_sub == list(range(256))
+        is_permutation = bool(np.array_equal(np.sort(sub_table), np.arange(256)))
         
         # Test 2: Check inverse table correctness
-        inverse_correct = all(inv_table[sub_table[i]] == i for i in range(256))
+        inverse_correct = bool(np.array_equal(inv_table[sub_table], np.arange(256)))
         
         # Test 3: Calculate avalanche effect (change in output for 1-bit input change)
-        avalanche_scores = []
-        test_data = bytes(range(256))  # Identity sequence
+        test_data = np.arange(256, dtype=np.uint8)  # Identity sequence
         
-        for bit_pos in range(8):  # Test each bit position
-            # Flip one bit in each byte and measure output changes
-            flipped_data = bytearray(test_data)
-            for i in range(256):
-                flipped_data[i] ^= (1 << bit_pos)
-                
-            # Count how many output bits change
-            bit_changes = 0
-            for i in range(256):
-                original_out = sub_table[test_data[i]]
-                flipped_out = sub_table[flipped_data[i]]
-                bit_changes += bin(original_out ^ flipped_out).count('1')
-                
-            # Good S-box should flip ~50% of output bits
-            avalanche_scores.append(bit_changes / (256 * 8))
+        # Flip each bit position across every byte at once: row b holds the
+        # inputs with bit b flipped
+        bit_masks = (1 << np.arange(8, dtype=np.uint8)).astype(np.uint8)
+        flipped_data = test_data[None, :] ^ bit_masks[:, None]
+        
+        # Count how many output bits change for every (bit position, byte)
+        output_diff = sub_table[test_data][None, :] ^ sub_table[flipped_data]
+        bit_changes = _POPCOUNT_TABLE[output_diff].sum(axis=1, dtype=np.int64)
+        
+        # Good S-box should flip ~50% of output bits
+        avalanche_scores = (bit_changes / (256 * 8)).tolist()
             
         avg_avalanche = sum(avalanche_scores) / len(avalanche_scores)
         
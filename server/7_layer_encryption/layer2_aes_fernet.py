@@ -2,13 +2,14 @@
 🔒 Layer 2: AES-Fernet (Authenticated Encryption Core)
 =====================================================
 
-This layer implements the core authenticated encryption using Fernet (AES-CBC + HMAC-SHA256).
+This layer implements the core authenticated encryption using AES-256-GCM by default, with
+the standard Fernet format (AES-CBC + HMAC-SHA256) still available and always decryptable.
 Provides both confidentiality and authenticity guarantees with a standardized, battle-tested
 implementation.
 
 Key Features:
-- AES-128 in CBC mode for confidentiality
-- HMAC-SHA256 for authentication and integrity
+- AES-256-GCM one-pass AEAD (default) or AES-128-CBC + HMAC-SHA256 (Fernet)
+- Token format detected on decrypt, so both formats remain readable
 - Automatic IV generation for each operation
 - Timestamp-based token format for replay protection
 - Standardized Fernet token structure
@@ -24,19 +25,26 @@ Implementation Details:
 - Uses Python cryptography library for FIPS compliance
 - Constant-time operations to prevent timing attacks
 - Secure random IV generation per encryption
-- Key stretching using PBKDF2 when needed
+- HKDF key derivation from the high-entropy master key (extract step cached per key)
+- 1.0 package tokens still derive their key with the original PBKDF2 (decrypt only)
 - Memory-safe handling of sensitive data
 """
 
 import base64
+import binascii
 import hashlib
+import hmac
+import os
 import secrets
 import struct
+import threading
 import time
-from typing import Tuple
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple, Union
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import InvalidToken
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 
 class AESFernetLayer:
@@ -44,12 +52,345 @@ class AESFernetLayer:
     Layer 2 of 7-layer encryption: Authenticated AES encryption using Fernet
     """
     
-    def __init__(self):
+    # Fernet token format constants (version byte, allowed clock skew for TTL checks)
+    FERNET_VERSION = 0x80
+    MAX_CLOCK_SKEW = 60
+    
+    # AES-GCM token format: version(1) + timestamp(8) + iv(12) + ciphertext + tag(16).
+    # The version byte can never start a base64 Fernet token, which is how
+    # decrypt tells the two formats apart.
+    GCM_VERSION = 0x81
+    GCM_IV_SIZE = 12
+    GCM_LAYER_ID = b"LAYER2_AESGCM"
+    
+    # 1.0 packages derived the Fernet key with PBKDF2 (salted by the nonce);
+    # decrypt(legacy=True) still reads them
+    LEGACY_PBKDF2_ITERATIONS = 100000
+    
+    # Primed per-key cipher contexts (AESGCM instances, keyed HMAC templates),
+    # shared by all layer objects (callers build a new orchestrator per
+    # message). Entries are keyed by a BLAKE2b fingerprint of the master key,
+    # so raw key bytes are never used as cache keys.
+    FERNET_CACHE_SIZE = 1024
+    _fernet_cache = OrderedDict()
+    _fernet_cache_lock = threading.Lock()
+    
+    # HKDF-Extract results per (master key, layer): each PRK is keyed into an
+    # HMAC template once, so a new nonce only costs a single HKDF-Expand block
+    PRK_CACHE_SIZE = 256
+    _prk_cache = OrderedDict()
+    _prk_cache_lock = threading.Lock()
+    
+    # Shared entropy pool for per-token IVs: one os.urandom() call serves
+    # hundreds of tokens instead of one syscall per encrypt
+    IV_POOL_SIZE = 4096
+    _iv_pool = b""
+    _iv_pool_offset = 0
+    _iv_pool_lock = threading.Lock()
+    
+    def __init__(self, use_gcm: bool = True):
+        """
+        Initialize the layer
+        
+        Args:
+            use_gcm: Produce AES-GCM tokens (default) instead of Fernet tokens.
+                     Decryption accepts either format regardless.
+        """
         self.fernet_instance = None
+        self.use_gcm = use_gcm
+    
+    @classmethod
+    def clear_cache(cls):
+        """Drop all cached layer contexts (e.g. after key rotation)"""
+        with cls._fernet_cache_lock:
+            cls._fernet_cache.clear()
+        with cls._prk_cache_lock:
+            cls._prk_cache.clear()
+    
+    @classmethod
+    def _next_iv(cls, size: int) -> bytes:
+        """
+        Take a fresh random IV from the shared entropy pool
+        
+        Args:
+            size: IV length in bytes
+            
+        Returns:
+            size random bytes, never handed out before
+        """
+        with cls._iv_pool_lock:
+            start = cls._iv_pool_offset
+            if start + size > len(cls._iv_pool):
+                # Pool exhausted - refill from the kernel CSPRNG
+                cls._iv_pool = os.urandom(cls.IV_POOL_SIZE)
+                start = 0
+            cls._iv_pool_offset = start + size
+            return cls._iv_pool[start:start + size]
+    
+    @classmethod
+    def _reset_iv_pool(cls):
+        """Discard pooled entropy so a forked child never reuses the parent's IVs"""
+        cls._iv_pool = b""
+        cls._iv_pool_offset = 0
+        cls._iv_pool_lock = threading.Lock()
+    
+    def _get_layer_context(self, master_key: bytes, nonce: bytes, layer_id: bytes, build,
+                           legacy: bool = False):
+        """
+        Get the primed cipher context for a (master key, nonce, layer id), building it on first use
+        
+        Args:
+            master_key: Master encryption key
+            nonce: Nonce the key is bound to
+            layer_id: Layer identifier for key separation
+            build: Callable turning the raw 32-byte derived key into a context
+            legacy: Derive the key the 1.0 way (PBKDF2) instead of HKDF
+            
+        Returns:
+            Cached context object returned by build
+        """
+        cache_key = (hashlib.blake2b(master_key, digest_size=16).digest(), bytes(nonce), layer_id, legacy)
+        cache = self._fernet_cache
+        
+        with self._fernet_cache_lock:
+            context = cache.get(cache_key)
+            if context is not None:
+                cache.move_to_end(cache_key)
+                return context
+        
+        # Derive and key-schedule outside the lock so slow setup does not
+        # serialize callers
+        derive = self._derive_legacy_layer_key if legacy else self._derive_layer_key
+        context = build(derive(master_key, nonce, layer_id))
+        
+        with self._fernet_cache_lock:
+            cache[cache_key] = context
+            cache.move_to_end(cache_key)
+            if len(cache) > self.FERNET_CACHE_SIZE:
+                cache.popitem(last=False)
+        
+        return context
+    
+    def _get_gcm_cipher(self, master_key: bytes, nonce: bytes) -> AESGCM:
+        """
+        Get the AES-GCM cipher for a (master key, nonce) pair
         
-    def _derive_fernet_key(self, master_key: bytes, nonce: bytes, layer_id: bytes = b"LAYER2_FERNET") -> bytes:
+        Args:
+            master_key: Master encryption key
+            nonce: Nonce the key is bound to
+            
+        Returns:
+            AESGCM instance with its key schedule already set up
+        """
+        return self._get_layer_context(master_key, nonce, self.GCM_LAYER_ID, AESGCM)
+    
+    @staticmethod
+    def _build_fernet_context(raw_key: bytes) -> Tuple[hmac.HMAC, bytes]:
+        """Split a 32-byte Fernet key and prime an HMAC with its signing half"""
+        # Keying HMAC hashes the ipad/opad blocks once; per-message copies
+        # of this template skip that setup
+        return hmac.new(raw_key[:16], digestmod='sha256'), raw_key[16:]
+    
+    def _get_fernet_keys(self, master_key: bytes, nonce: bytes,
+                         layer_id: bytes = b"LAYER2_FERNET", legacy: bool = False) -> Tuple[hmac.HMAC, bytes]:
         """
-        Derive Fernet-compatible key from master key and nonce
+        Get the Fernet key material for a (master key, nonce) pair
+        
+        Args:
+            master_key: Master encryption key
+            nonce: Nonce the Fernet key is bound to
+            layer_id: Layer identifier for key separation
+            legacy: Use the 1.0 PBKDF2 key derivation
+            
+        Returns:
+            Tuple of (signer, encryption_key): a keyed HMAC-SHA256 template
+            (never updated directly, only copied) and the 16-byte AES key
+        """
+        return self._get_layer_context(master_key, nonce, layer_id, self._build_fernet_context, legacy)
+    
+    def _check_token_age(self, timestamp: int, ttl: Optional[int]):
+        """
+        Apply Fernet's expiry and clock-skew rules to a token timestamp
+        
+        Raises:
+            InvalidToken: If the token is expired or too far in the future
+        """
+        if ttl is None:
+            return
+        current_time = time.time_ns() // 1_000_000_000
+        if timestamp + ttl < current_time:
+            raise InvalidToken
+        if current_time + self.MAX_CLOCK_SKEW < timestamp:
+            raise InvalidToken
+    
+    def _gcm_encrypt(self, aead: AESGCM, plaintext: bytes) -> bytes:
+        """
+        Produce an AES-256-GCM token (single pass, no padding)
+        
+        Args:
+            aead: Cipher from _get_gcm_cipher
+            plaintext: Data to encrypt
+            
+        Returns:
+            Raw token: version | timestamp | IV | ciphertext+tag
+        """
+        # A fresh random IV per token: the same (key, nonce) pair may seal
+        # several messages (e.g. encrypt_batch with a shared nonce)
+        iv = self._next_iv(self.GCM_IV_SIZE)
+        header = struct.pack('>BQ', self.GCM_VERSION, time.time_ns() // 1_000_000_000)
+        
+        # Header and layer ID are authenticated as associated data
+        sealed = aead.encrypt(iv, plaintext, header + self.GCM_LAYER_ID)
+        
+        return header + iv + sealed
+    
+    def _gcm_decrypt(self, aead: AESGCM, token: bytes, ttl: Optional[int] = None) -> bytes:
+        """
+        Verify and decrypt an AES-256-GCM token
+        
+        Args:
+            aead: Cipher from _get_gcm_cipher
+            token: Raw AES-GCM token
+            ttl: Time-to-live in seconds (None for no expiration check)
+            
+        Returns:
+            Decrypted plaintext
+            
+        Raises:
+            InvalidToken: If the token is malformed, expired or fails authentication
+        """
+        # version(1) + timestamp(8) + iv(12) + tag(16)
+        if len(token) < 37 or token[0] != self.GCM_VERSION:
+            raise InvalidToken
+        
+        header = token[:9]
+        self._check_token_age(struct.unpack('>Q', header[1:])[0], ttl)
+        
+        iv = token[9:9 + self.GCM_IV_SIZE]
+        try:
+            return aead.decrypt(iv, token[9 + self.GCM_IV_SIZE:], header + self.GCM_LAYER_ID)
+        except InvalidTag:
+            raise InvalidToken
+    
+    def _is_gcm_token(self, token: bytes) -> bool:
+        """Check whether a parsed layer token uses the AES-GCM format"""
+        return token[:1] == bytes((self.GCM_VERSION,))
+    
+    def _seal(self, master_key: bytes, nonce: bytes, plaintext: bytes) -> bytes:
+        """Encrypt plaintext into a token in this layer's configured format"""
+        if self.use_gcm:
+            return self._gcm_encrypt(self._get_gcm_cipher(master_key, nonce), plaintext)
+        return self._fernet_encrypt(self._get_fernet_keys(master_key, nonce), plaintext)
+    
+    def _open(self, master_key: bytes, nonce: bytes, token: bytes, ttl: Optional[int] = None,
+              legacy: bool = False) -> bytes:
+        """Decrypt a token in either format (1.0 packages only ever hold Fernet tokens)"""
+        if legacy:
+            return self._fernet_decrypt(self._get_fernet_keys(master_key, nonce, legacy=True), token, ttl)
+        if self._is_gcm_token(token):
+            return self._gcm_decrypt(self._get_gcm_cipher(master_key, nonce), token, ttl)
+        return self._fernet_decrypt(self._get_fernet_keys(master_key, nonce), token, ttl)
+    
+    def _fernet_encrypt(self, keys: Tuple[hmac.HMAC, bytes], plaintext: bytes) -> bytes:
+        """
+        Produce a standard Fernet token using AES-128-CBC + HMAC-SHA256 directly
+        
+        Args:
+            keys: (signer, encryption_key) from _get_fernet_keys
+            plaintext: Data to encrypt
+            
+        Returns:
+            Base64url Fernet token (version | timestamp | IV | ciphertext | HMAC)
+        """
+        signer, encryption_key = keys
+        iv = self._next_iv(16)
+        
+        # PKCS7 pad to the AES block size, then encrypt in one OpenSSL pass
+        pad_len = 16 - len(plaintext) % 16
+        padded = plaintext + bytes((pad_len,)) * pad_len
+        encryptor = Cipher(algorithms.AES(encryption_key), modes.CBC(iv)).encryptor()
+        ciphertext = encryptor.update(padded) + encryptor.finalize()
+        
+        # Authenticate version, timestamp, IV and ciphertext (copy of the
+        # pre-keyed HMAC, so only the message blocks are hashed)
+        basic_parts = struct.pack('>BQ', self.FERNET_VERSION, time.time_ns() // 1_000_000_000) + iv + ciphertext
+        mac = signer.copy()
+        mac.update(basic_parts)
+        tag = mac.digest()
+        
+        return base64.urlsafe_b64encode(basic_parts + tag)
+    
+    def _fernet_authenticate(self, signer: hmac.HMAC, token: bytes, ttl: Optional[int] = None) -> bytes:
+        """
+        Decode a standard Fernet token and verify its format, age and HMAC
+        
+        Args:
+            signer: Pre-keyed HMAC template from _get_fernet_keys
+            token: Base64url Fernet token
+            ttl: Time-to-live in seconds (None for no expiration check)
+            
+        Returns:
+            Raw decoded token bytes, authenticated but still encrypted
+            
+        Raises:
+            InvalidToken: If the token is malformed, expired or fails authentication
+        """
+        try:
+            data = base64.urlsafe_b64decode(token)
+        except (TypeError, binascii.Error):
+            raise InvalidToken
+        
+        # version(1) + timestamp(8) + iv(16) + at least one block(16) + hmac(32)
+        if len(data) < 73 or data[0] != self.FERNET_VERSION:
+            raise InvalidToken
+        
+        # Same expiry and clock-skew rules as cryptography's Fernet
+        self._check_token_age(struct.unpack('>Q', data[1:9])[0], ttl)
+        
+        # Verify HMAC (constant-time compare) before touching the ciphertext
+        mac = signer.copy()
+        mac.update(data[:-32])
+        expected_tag = mac.digest()
+        if not hmac.compare_digest(expected_tag, data[-32:]):
+            raise InvalidToken
+        
+        return data
+    
+    def _fernet_decrypt(self, keys: Tuple[hmac.HMAC, bytes], token: bytes, ttl: Optional[int] = None) -> bytes:
+        """
+        Verify and decrypt a standard Fernet token
+        
+        Args:
+            keys: (signer, encryption_key) from _get_fernet_keys
+            token: Base64url Fernet token
+            ttl: Time-to-live in seconds (None for no expiration check)
+            
+        Returns:
+            Decrypted plaintext
+            
+        Raises:
+            InvalidToken: If the token is malformed, expired or fails authentication
+        """
+        signer, encryption_key = keys
+        data = self._fernet_authenticate(signer, token, ttl)
+        
+        ciphertext = data[25:-32]
+        if len(ciphertext) % 16:
+            raise InvalidToken
+        
+        iv = data[9:25]
+        decryptor = Cipher(algorithms.AES(encryption_key), modes.CBC(iv)).decryptor()
+        padded = decryptor.update(ciphertext) + decryptor.finalize()
+        
+        # Strip PKCS7 padding (authenticated above, so no padding oracle)
+        pad_len = padded[-1]
+        if not 1 <= pad_len <= 16 or padded[-pad_len:] != bytes((pad_len,)) * pad_len:
+            raise InvalidToken
+        return padded[:-pad_len]
+        
+    def _derive_layer_key(self, master_key: bytes, nonce: bytes, layer_id: bytes = b"LAYER2_FERNET") -> bytes:
+        """
+        Derive the raw 32-byte layer key from master key and nonce
         
         Args:
             master_key: Master encryption key
@@ -57,26 +398,64 @@ class AESFernetLayer:
             layer_id: Layer identifier for key separation
             
         Returns:
-            32-byte Fernet key (base64url encoded internally by Fernet)
+            32 raw key bytes
         """
-        # Create salt for PBKDF2 from nonce and layer ID
-        salt = hashlib.sha256(nonce + layer_id + b"SALT").digest()[:16]
+        # The master key is already uniformly random, so a single HKDF
+        # extract-and-expand is sufficient (iterated stretching like PBKDF2 only
+        # helps low-entropy passwords). Extract depends only on the master key
+        # and layer ID and is cached; per nonce, HKDF-Expand with
+        # info = nonce || layer_id needs one HMAC block for 32 bytes of output.
+        # Only 1.1+ packages use this; 1.0 ones go through _derive_legacy_layer_key.
+        mac = self._get_prk_signer(master_key, layer_id).copy()
+        mac.update(bytes(nonce) + layer_id + b"\x01")
         
-        # Use PBKDF2 for key derivation (Fernet standard)
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,  # Fernet requires 32-byte key
-            salt=salt,
-            iterations=100000,  # Strong iteration count for security
-        )
+        return mac.digest()
+    
+    def _derive_legacy_layer_key(self, master_key: bytes, nonce: bytes, layer_id: bytes = b"LAYER2_FERNET") -> bytes:
+        """
+        Derive the raw 32-byte layer key the way 1.0 packages did (PBKDF2-SHA256)
         
-        # Derive key and encode for Fernet
-        derived_key = kdf.derive(master_key)
+        Args:
+            master_key: Master encryption key
+            nonce: Nonce stored in the token
+            layer_id: Layer identifier for key separation
+            
+        Returns:
+            32 raw key bytes
+        """
+        salt = hashlib.sha256(bytes(nonce) + layer_id + b"SALT").digest()[:16]
+        return hashlib.pbkdf2_hmac('sha256', master_key, salt, self.LEGACY_PBKDF2_ITERATIONS, 32)
+    
+    def _get_prk_signer(self, master_key: bytes, layer_id: bytes) -> hmac.HMAC:
+        """
+        Get the HMAC template keyed with HKDF-Extract(salt=layer_id, IKM=master_key)
+        
+        Args:
+            master_key: Master encryption key
+            layer_id: Layer identifier (HKDF salt)
+            
+        Returns:
+            Keyed HMAC-SHA256 template (only ever copied, never updated)
+        """
+        cache_key = (hashlib.blake2b(master_key, digest_size=16).digest(), layer_id)
+        cache = self._prk_cache
+        
+        with self._prk_cache_lock:
+            signer = cache.get(cache_key)
+            if signer is not None:
+                cache.move_to_end(cache_key)
+                return signer
         
-        # Fernet expects base64url encoded key
-        fernet_key = base64.urlsafe_b64encode(derived_key)
+        prk = hmac.digest(layer_id, master_key, 'sha256')
+        signer = hmac.new(prk, digestmod='sha256')
         
-        return fernet_key
+        with self._prk_cache_lock:
+            cache[cache_key] = signer
+            cache.move_to_end(cache_key)
+            if len(cache) > self.PRK_CACHE_SIZE:
+                cache.popitem(last=False)
+        
+        return signer
     
     def _create_enhanced_token(self, fernet_token: bytes, nonce: bytes) -> bytes:
         """
@@ -96,51 +475,50 @@ class AESFernetLayer:
         if nonce_len > 255:
             raise ValueError("Nonce too long (max 255 bytes)")
             
-        # Pack token with metadata
-        enhanced_token = bytearray()
-        enhanced_token.append(nonce_len)  # 1 byte: nonce length
-        enhanced_token.extend(nonce)      # Variable: nonce data
-        enhanced_token.extend(struct.pack('<I', token_len))  # 4 bytes: token length
-        enhanced_token.extend(fernet_token)  # Variable: Fernet token
-        
-        return bytes(enhanced_token)
+        # Join sizes the output once and copies each part straight in: no
+        # per-length struct format to compile and no intermediate buffer.
+        # 1 byte nonce length, nonce, 4 byte token length, Fernet token
+        return b"".join((bytes((nonce_len,)), nonce, token_len.to_bytes(4, 'little'), fernet_token))
     
-    def _parse_enhanced_token(self, enhanced_token: bytes) -> Tuple[bytes, bytes]:
+    def _parse_enhanced_token(self, enhanced_token: bytes, copy: bool = True) -> Tuple[bytes, bytes]:
         """
         Parse enhanced token to extract nonce and Fernet token
         
         Args:
             enhanced_token: Enhanced token with metadata
+            copy: Return bytes (default). Metadata-only callers pass False to
+                  get zero-copy memoryview slices of the input instead.
             
         Returns:
             Tuple of (nonce, fernet_token)
         """
-        if len(enhanced_token) < 6:  # Minimum: 1 + 1 + 4 = 6 bytes
-            raise ValueError("Invalid enhanced token: too short")
-            
-        # Parse nonce
-        nonce_len = enhanced_token[0]
-        if len(enhanced_token) < 1 + nonce_len + 4:
-            raise ValueError("Invalid enhanced token: corrupted nonce section")
-            
-        nonce = enhanced_token[1:1 + nonce_len]
+        # Slicing a view is O(1); bytes are only materialized once validated
+        view = memoryview(enhanced_token)
+        total_len = view.nbytes
         
-        # Parse Fernet token length
-        token_len_start = 1 + nonce_len
-        token_len = struct.unpack('<I', enhanced_token[token_len_start:token_len_start + 4])[0]
+        # Read every header field before judging any of them, so malformed
+        # tokens all fail at the same point with the same error (no early
+        # exit that reveals which part of the structure was wrong)
+        nonce_len = view[0] if total_len else 0
+        fernet_start = 1 + nonce_len + 4
+        header_ok = total_len >= fernet_start
+        token_len = struct.unpack_from('<I', view, fernet_start - 4)[0] if header_ok else 0
         
-        # Extract Fernet token
-        fernet_start = token_len_start + 4
-        if len(enhanced_token) < fernet_start + token_len:
-            raise ValueError("Invalid enhanced token: corrupted token section")
+        # Minimum: 1 + 1 + 4 = 6 bytes, header present, token section present
+        valid = (total_len >= 6) & header_ok & (total_len >= fernet_start + token_len)
+        if not valid:
+            raise ValueError("Invalid enhanced token: malformed structure")
             
-        fernet_token = enhanced_token[fernet_start:fernet_start + token_len]
+        nonce = view[1:1 + nonce_len]
+        fernet_token = view[fernet_start:fernet_start + token_len]
+        if copy:
+            return bytes(nonce), bytes(fernet_token)
         
         return nonce, fernet_token
     
     def encrypt(self, plaintext: bytes, master_key: bytes, nonce: bytes) -> bytes:
         """
-        Encrypt plaintext using AES-Fernet authenticated encryption
+        Encrypt plaintext using AES-GCM (or Fernet) authenticated encryption
         
         Args:
             plaintext: Data to encrypt
@@ -148,7 +526,7 @@ class AESFernetLayer:
             nonce: Unique nonce for this operation (16+ bytes)
             
         Returns:
-            Enhanced Fernet token with metadata
+            Enhanced token with metadata
         """
         if len(master_key) < 32:
             raise ValueError("Master key must be at least 32 bytes")
@@ -157,28 +535,23 @@ class AESFernetLayer:
         if not plaintext:
             raise ValueError("Plaintext cannot be empty")
             
-        # Derive Fernet key for this operation
-        fernet_key = self._derive_fernet_key(master_key, nonce)
-        
-        # Create Fernet instance
-        fernet = Fernet(fernet_key)
-        
-        # Encrypt with timestamp (standard Fernet behavior)
-        fernet_token = fernet.encrypt(plaintext)
+        # Encrypt with timestamp using the (cached) key for this key and nonce
+        layer_token = self._seal(master_key, nonce, plaintext)
         
         # Create enhanced token with metadata
-        enhanced_token = self._create_enhanced_token(fernet_token, nonce)
+        enhanced_token = self._create_enhanced_token(layer_token, nonce)
         
         return enhanced_token
     
-    def decrypt(self, ciphertext: bytes, master_key: bytes, ttl: int = None) -> bytes:
+    def decrypt(self, ciphertext: bytes, master_key: bytes, ttl: int = None, legacy: bool = False) -> bytes:
         """
-        Decrypt ciphertext using AES-Fernet authenticated decryption
+        Decrypt ciphertext using AES-GCM or AES-Fernet authenticated decryption
         
         Args:
-            ciphertext: Enhanced Fernet token to decrypt
+            ciphertext: Enhanced token to decrypt (either format)
             master_key: Master encryption key (must match encryption key)
             ttl: Time-to-live in seconds (None for no expiration check)
+            legacy: Token comes from a 1.0 package (PBKDF2-derived Fernet key)
             
         Returns:
             Decrypted plaintext
@@ -191,51 +564,229 @@ class AESFernetLayer:
         # Parse enhanced token
         nonce, fernet_token = self._parse_enhanced_token(ciphertext)
         
-        # Derive same Fernet key
-        fernet_key = self._derive_fernet_key(master_key, nonce)
-        
-        # Create Fernet instance
-        fernet = Fernet(fernet_key)
+        # Decrypt with optional TTL check (token format is detected)
+        return self._open(master_key, nonce, fernet_token, ttl, legacy)
+    
+    def token_size(self, plaintext_len: int, nonce_len: int) -> int:
+        """
+        Exact size of the enhanced token encrypt() produces for a given input
         
-        # Decrypt with optional TTL check
-        if ttl is not None:
-            plaintext = fernet.decrypt(fernet_token, ttl=ttl)
+        Args:
+            plaintext_len: Plaintext length in bytes
+            nonce_len: Nonce length in bytes
+            
+        Returns:
+            Enhanced token length in bytes for the configured format
+        """
+        if self.use_gcm:
+            # version(1) + timestamp(8) + iv + ciphertext + tag(16)
+            layer_len = 9 + self.GCM_IV_SIZE + plaintext_len + 16
         else:
-            plaintext = fernet.decrypt(fernet_token)
+            # version(1) + timestamp(8) + iv(16) + padded ciphertext + hmac(32), base64url
+            raw_len = 57 + (plaintext_len // 16 + 1) * 16
+            layer_len = 4 * ((raw_len + 2) // 3)
+        
+        # [nonce_length:1][nonce][token_length:4][token]
+        return 5 + nonce_len + layer_len
+    
+    def encrypt_into(self, out, plaintext: bytes, master_key: bytes, nonce: bytes) -> int:
+        """
+        Encrypt plaintext and write the enhanced token into a caller-owned buffer
+        
+        Lets servers that keep a send buffer reuse it instead of allocating
+        a new token per message. Size the buffer with token_size().
+        
+        Args:
+            out: Writable bytes-like object (bytearray, memoryview, ...)
+            plaintext: Data to encrypt
+            master_key: Master encryption key (32+ bytes)
+            nonce: Unique nonce for this operation (16+ bytes, at most 255)
             
-        return plaintext
+        Returns:
+            Number of bytes written at the start of out
+        """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
+        if len(nonce) < 16:
+            raise ValueError("Nonce must be at least 16 bytes")
+        if len(nonce) > 255:
+            raise ValueError("Nonce too long (max 255 bytes)")
+        if not plaintext:
+            raise ValueError("Plaintext cannot be empty")
+            
+        view = memoryview(out).cast('B')
+        nonce_len = len(nonce)
+        total_len = self.token_size(len(plaintext), nonce_len)
+        
+        # Check capacity before doing any cryptographic work
+        if view.nbytes < total_len:
+            raise ValueError(f"Output buffer too small: need {total_len} bytes, got {view.nbytes}")
+            
+        layer_token = self._seal(master_key, nonce, plaintext)
+        
+        # Write the frame in place: [nonce_length:1][nonce][token_length:4][token]
+        token_start = 5 + nonce_len
+        view[0] = nonce_len
+        view[1:1 + nonce_len] = nonce
+        struct.pack_into('<I', view, 1 + nonce_len, len(layer_token))
+        view[token_start:token_start + len(layer_token)] = layer_token
+        
+        return token_start + len(layer_token)
     
-    def extract_timestamp(self, ciphertext: bytes) -> int:
+    def encrypt_gcm(self, plaintext: bytes, master_key: bytes, nonce: bytes) -> bytes:
         """
-        Extract timestamp from Fernet token without decryption
+        Encrypt plaintext with AES-256-GCM regardless of the configured default
         
         Args:
-            ciphertext: Enhanced Fernet token
+            plaintext: Data to encrypt
+            master_key: Master encryption key (32+ bytes)
+            nonce: Unique nonce for this operation (16+ bytes)
             
         Returns:
-            Unix timestamp when token was created
+            Enhanced AES-GCM token with metadata
+        """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
+        if len(nonce) < 16:
+            raise ValueError("Nonce must be at least 16 bytes")
+        if not plaintext:
+            raise ValueError("Plaintext cannot be empty")
+            
+        aead = self._get_gcm_cipher(master_key, nonce)
+        return self._create_enhanced_token(self._gcm_encrypt(aead, plaintext), nonce)
+    
+    def decrypt_gcm(self, ciphertext: bytes, master_key: bytes, ttl: int = None) -> bytes:
+        """
+        Decrypt an AES-256-GCM enhanced token, rejecting any other format
+        
+        Args:
+            ciphertext: Enhanced AES-GCM token to decrypt
+            master_key: Master encryption key (must match encryption key)
+            ttl: Time-to-live in seconds (None for no expiration check)
+            
+        Returns:
+            Decrypted plaintext
         """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
         if not ciphertext:
             raise ValueError("Ciphertext cannot be empty")
             
-        # Parse enhanced token to get Fernet token
-        nonce, fernet_token = self._parse_enhanced_token(ciphertext)
+        nonce, gcm_token = self._parse_enhanced_token(ciphertext)
+        aead = self._get_gcm_cipher(master_key, nonce)
+        return self._gcm_decrypt(aead, gcm_token, ttl)
+    
+    def _extract_timestamp_from_token(self, fernet_token: bytes) -> int:
+        """
+        Read the creation timestamp from an already-parsed layer token
         
+        Args:
+            fernet_token: AES-GCM token or standard Fernet token (base64url)
+            
+        Returns:
+            Unix timestamp when token was created
+        """
+        # AES-GCM tokens carry the timestamp in clear binary after the version
+        if self._is_gcm_token(fernet_token):
+            if len(fernet_token) < 37:
+                raise ValueError("Invalid AES-GCM token: too short")
+            return struct.unpack_from('>Q', fernet_token, 1)[0]
+            
         # Fernet token format: version(1) + timestamp(8) + iv(16) + ciphertext + hmac(32)
         if len(fernet_token) < 57:  # Minimum Fernet token size
             raise ValueError("Invalid Fernet token: too short")
             
-        # Decode base64 token
+        # Only the first 12 base64 characters (9 bytes) are needed for the header
         try:
-            token_data = base64.urlsafe_b64decode(fernet_token)
+            token_header = base64.urlsafe_b64decode(fernet_token[:12])
         except Exception:
             raise ValueError("Invalid Fernet token: bad base64 encoding")
             
         # Extract timestamp (bytes 1-9)
-        timestamp = struct.unpack('>Q', token_data[1:9])[0]
+        timestamp = struct.unpack('>Q', token_header[1:9])[0]
         
         return timestamp
     
+    def encrypt_batch(self, plaintexts: Sequence[bytes], master_key: bytes,
+                      nonces: Union[bytes, Sequence[bytes]]) -> List[bytes]:
+        """
+        Encrypt many messages under one master key in a single call
+        
+        Keys are derived once per distinct nonce in the batch, and per-call
+        validation and lookups are paid once instead of per message.
+        
+        Args:
+            plaintexts: Messages to encrypt
+            master_key: Master encryption key (32+ bytes)
+            nonces: One nonce for the whole batch, or one nonce per message
+            
+        Returns:
+            Enhanced tokens in the same order as the input
+        """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
+        if isinstance(nonces, (bytes, bytearray)):
+            nonces = [bytes(nonces)] * len(plaintexts)
+        elif len(nonces) != len(plaintexts):
+            raise ValueError("Need one nonce per message (or a single shared nonce)")
+            
+        tokens = []
+        for plaintext, nonce in zip(plaintexts, nonces):
+            if len(nonce) < 16:
+                raise ValueError("Nonce must be at least 16 bytes")
+            if not plaintext:
+                raise ValueError("Plaintext cannot be empty")
+                
+            # Keys come from the shared cache, derived once per distinct nonce
+            layer_token = self._seal(master_key, nonce, plaintext)
+            tokens.append(self._create_enhanced_token(layer_token, nonce))
+            
+        return tokens
+    
+    def decrypt_batch(self, ciphertexts: Sequence[bytes], master_key: bytes,
+                      ttl: int = None) -> List[bytes]:
+        """
+        Decrypt many enhanced tokens under one master key in a single call
+        
+        Args:
+            ciphertexts: Enhanced tokens to decrypt (either format)
+            master_key: Master encryption key (must match encryption key)
+            ttl: Time-to-live in seconds (None for no expiration check)
+            
+        Returns:
+            Decrypted plaintexts in the same order as the input
+        """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
+            
+        plaintexts = []
+        for ciphertext in ciphertexts:
+            if not ciphertext:
+                raise ValueError("Ciphertext cannot be empty")
+                
+            nonce, fernet_token = self._parse_enhanced_token(ciphertext)
+            plaintexts.append(self._open(master_key, nonce, fernet_token, ttl))
+            
+        return plaintexts
+    
+    def extract_timestamp(self, ciphertext: bytes) -> int:
+        """
+        Extract timestamp from Fernet token without decryption
+        
+        Args:
+            ciphertext: Enhanced Fernet token
+            
+        Returns:
+            Unix timestamp when token was created
+        """
+        if not ciphertext:
+            raise ValueError("Ciphertext cannot be empty")
+            
+        # Parse enhanced token to get Fernet token (views - only the header is read)
+        nonce, fernet_token = self._parse_enhanced_token(ciphertext, copy=False)
+        
+        return self._extract_timestamp_from_token(fernet_token)
+    
     def verify_token_integrity(self, ciphertext: bytes, master_key: bytes) -> bool:
         """
         Verify token integrity without full decryption
@@ -251,39 +802,43 @@ class AESFernetLayer:
             # Parse enhanced token
             nonce, fernet_token = self._parse_enhanced_token(ciphertext)
             
-            # Derive Fernet key
-            fernet_key = self._derive_fernet_key(master_key, nonce)
-            
-            # Create Fernet instance
-            fernet = Fernet(fernet_key)
-            
-            # Try to decrypt (will raise exception if HMAC fails)
-            fernet.decrypt(fernet_token)
+            if self._is_gcm_token(fernet_token):
+                # The GCM tag is only checked as part of decryption
+                self._gcm_decrypt(self._get_gcm_cipher(master_key, nonce), fernet_token)
+            else:
+                # HMAC check only - integrity does not require running AES-CBC
+                signer, _ = self._get_fernet_keys(master_key, nonce)
+                self._fernet_authenticate(signer, fernet_token)
             
             return True
             
         except Exception:
             return False
     
-    def get_token_info(self, ciphertext: bytes) -> dict:
+    def get_token_info(self, ciphertext: bytes, current_time: int = None) -> dict:
         """
         Extract information from token without decryption
         
         Args:
             ciphertext: Enhanced Fernet token
+            current_time: Unix time to measure age against (defaults to now;
+                          pass one value when inspecting many tokens)
             
         Returns:
             Dictionary with token information
         """
         try:
-            nonce, fernet_token = self._parse_enhanced_token(ciphertext)
-            timestamp = self.extract_timestamp(ciphertext)
+            # Parse once (zero-copy views) and read the timestamp from the parsed token
+            nonce, fernet_token = self._parse_enhanced_token(ciphertext, copy=False)
+            timestamp = self._extract_timestamp_from_token(fernet_token)
             
             # Calculate token age
-            current_time = int(time.time())
+            if current_time is None:
+                current_time = time.time_ns() // 1_000_000_000
             age_seconds = current_time - timestamp
             
             return {
+                "format": "aes-gcm" if self._is_gcm_token(fernet_token) else "fernet",
                 "nonce_length": len(nonce),
                 "token_length": len(fernet_token),
                 "total_length": len(ciphertext),
@@ -301,6 +856,11 @@ class AESFernetLayer:
             }
 
 
+# A forked worker must not hand out IVs already pooled by its parent
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=AESFernetLayer._reset_iv_pool)
+
+
 # Test and demonstration code
 if __name__ == "__main__":
     import secrets
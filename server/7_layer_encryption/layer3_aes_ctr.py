@@ -29,73 +29,209 @@ Implementation Details:
 """
 
 import hashlib
+import os
 import secrets
 import struct
-from typing import Tuple
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Sequence, Tuple
+import numpy as np
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 
+# Little-endian CTR counter word, compiled once instead of per call
+_U32 = struct.Struct('<I')
+
+# Inputs at least this long are compared with NumPy; bin().count on one huge
+# integer grows much faster than linearly, while NumPy only wins past ~256 bytes
+_HAMMING_NUMPY_MIN = 256
+
+# Per-byte popcount fallback for NumPy releases without np.bitwise_count (< 2.0)
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# CTR mode increments the whole 16-byte counter block as a big-endian integer
+_COUNTER_MASK = (1 << 128) - 1
+
+
+class StreamInfo(NamedTuple):
+    """
+    Counter and size details of a packed CTR stream
+    
+    Values that are the same for every stream are class attributes, so
+    each result carries only the four per-stream fields.
+    """
+    nonce: bytes  # 12-byte nonce part of the IV (call .hex() when logging)
+    initial_counter: int
+    data_length: int
+    aes_blocks: int
+    
+    iv_length = 16
+    overhead_bytes = 16
+    is_stream = True
+    cipher_mode = "AES-256-CTR"
+
 
 class AESCTRLayer:
     """
     Layer 3 of 7-layer encryption: Independent AES-CTR stream encryption
     """
     
+    # Derived (key, iv, cipher) entries, shared by all layer objects (callers build a new
+    # orchestrator per message). Entries are keyed by a BLAKE2b fingerprint of
+    # the master key, so raw key bytes are never used as cache keys.
+    MATERIAL_CACHE_SIZE = 256
+    _material_cache = OrderedDict()
+    _material_cache_lock = threading.Lock()
+    
+    # Payloads of at least PARALLEL_THRESHOLD bytes are cut into counter-aligned
+    # shards that run on a shared thread pool (OpenSSL releases the GIL during
+    # AES). Smaller payloads, and single-core hosts, stay on one context.
+    PARALLEL_THRESHOLD = 1024 * 1024
+    PARALLEL_SHARD_SIZE = 256 * 1024
+    _executor = None
+    _executor_lock = threading.Lock()
+    
     def __init__(self):
         self.backend = default_backend()
         
-    def _derive_ctr_key(self, master_key: bytes, nonce: bytes, layer_id: bytes = b"LAYER3_AESCTR") -> bytes:
+    @classmethod
+    def clear_cache(cls):
+        """Drop all cached CTR keys, IVs and ciphers (e.g. after key rotation)"""
+        with cls._material_cache_lock:
+            cls._material_cache.clear()
+    
+    def _derive_material(self, master_key: bytes, nonce: bytes,
+                         legacy: bool = False) -> Tuple[bytes, bytes, Cipher]:
         """
-        Derive AES-CTR key independent from other layers
+        Get the CTR key, IV and cipher for a (master key, nonce) pair, building them on first use
         
         Args:
             master_key: Master encryption key
             nonce: Unique nonce for this operation
-            layer_id: Layer identifier for key separation
+            legacy: Use the 1.0 SHA-256 derivation instead of keyed BLAKE2b
             
         Returns:
-            32-byte AES-256 key for CTR mode
+            Tuple of (32-byte key, 16-byte IV, configured AES-CTR cipher)
         """
-        # Create layer-specific key derivation context
-        context = layer_id + nonce + b"AES256_CTR_KEY"
-        
-        # Use SHA-256 for key derivation
-        key_material = hashlib.sha256(master_key + context).digest()
+        cache_key = (hashlib.blake2b(master_key, digest_size=16).digest(), bytes(nonce), legacy)
+        cache = self._material_cache
+        
+        with self._material_cache_lock:
+            material = cache.get(cache_key)
+            if material is not None:
+                cache.move_to_end(cache_key)
+                return material
+        
+        # Derive outside the lock so slow derivations do not serialize callers.
+        # The Cipher object is immutable and hands out a fresh context per
+        # encryptor()/decryptor() call, so one instance serves every message.
+        derive = self._derive_legacy_key_iv if legacy else self._derive_key_iv
+        ctr_key, iv = derive(master_key, nonce)
+        material = (ctr_key, iv, self._create_ctr_cipher(ctr_key, iv))
+        
+        with self._material_cache_lock:
+            cache[cache_key] = material
+            cache.move_to_end(cache_key)
+            if len(cache) > self.MATERIAL_CACHE_SIZE:
+                cache.popitem(last=False)
+        
+        return material
+        
+    def derive_bulk(self, master_key: bytes, nonces: Sequence[bytes]) -> List[Tuple[bytes, bytes]]:
+        """
+        Derive CTR keys and IVs for many nonces under one master key (e.g. bulk rekeying)
         
-        # Double hash for additional security margin
-        derived_key = hashlib.sha256(key_material + context[:16]).digest()
+        The keyed BLAKE2b state for the master key is built once and copied
+        per nonce, and the results are stored in the material
+        cache under a single lock acquisition, so later encrypt/decrypt
+        calls for these nonces skip derivation.
         
-        return derived_key
+        Args:
+            master_key: Master encryption key (32+ bytes)
+            nonces: Nonces to derive material for (16+ bytes each)
+            
+        Returns:
+            (key, iv) tuples in the same order as nonces
+        """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
+            
+        fingerprint = hashlib.blake2b(master_key, digest_size=16).digest()
+        kdf_key = master_key if len(master_key) <= 64 else self._kdf_key(master_key)
+        prefix = hashlib.blake2b(digest_size=48, key=kdf_key, person=b"LAYER3_AESCTR")
+        
+        entries = []
+        for nonce in nonces:
+            if len(nonce) < 16:
+                raise ValueError("Nonce must be at least 16 bytes")
+            # Same digest as _derive_key_iv
+            h = prefix.copy()
+            h.update(nonce)
+            material = h.digest()
+            ctr_key, iv = material[:32], material[32:]
+            entries.append(((fingerprint, bytes(nonce), False), (ctr_key, iv, self._create_ctr_cipher(ctr_key, iv))))
+            
+        cache = self._material_cache
+        with self._material_cache_lock:
+            # Only the most recent MATERIAL_CACHE_SIZE entries would survive anyway
+            for cache_key, material in entries[-self.MATERIAL_CACHE_SIZE:]:
+                cache[cache_key] = material
+                cache.move_to_end(cache_key)
+            while len(cache) > self.MATERIAL_CACHE_SIZE:
+                cache.popitem(last=False)
+                
+        return [material[:2] for _, material in entries]
     
-    def _generate_ctr_iv(self, master_key: bytes, nonce: bytes, layer_id: bytes = b"LAYER3_AESCTR") -> bytes:
+    def _derive_key_iv(self, master_key: bytes, nonce: bytes,
+                       layer_id: bytes = b"LAYER3_AESCTR") -> Tuple[bytes, bytes]:
         """
-        Generate cryptographically secure IV for CTR mode
+        Derive AES-CTR key and IV independent from other layers
         
         Args:
             master_key: Master encryption key
             nonce: Unique nonce for this operation
-            layer_id: Layer identifier for IV separation
+            layer_id: Layer identifier for key separation
             
         Returns:
-            16-byte IV for AES-CTR (12 bytes nonce + 4 bytes counter start)
+            Tuple of (32-byte AES-256 key, 16-byte IV: 12 bytes nonce + 4 bytes counter start)
         """
-        # Create IV derivation context
-        iv_context = layer_id + nonce + b"CTR_IV_GENERATION"
-        
-        # Derive IV material from master key and context
-        iv_material = hashlib.sha256(master_key + iv_context).digest()
-        
-        # Take first 12 bytes for CTR nonce, last 4 bytes for counter initialization
-        ctr_nonce = iv_material[:12]
+        # Keyed BLAKE2b takes the master key as a MAC key and the layer id
+        # as personalization, so no key/context concatenation is built;
+        # one 48-byte digest yields key and IV together
+        if len(master_key) > 64:
+            master_key = self._kdf_key(master_key)
+        material = hashlib.blake2b(nonce, digest_size=48, key=master_key, person=layer_id).digest()
+        
+        # Counter start comes from derived material too (not zero for
+        # additional security)
+        return material[:32], material[32:]
+    
+    def _derive_legacy_key_iv(self, master_key: bytes, nonce: bytes,
+                              layer_id: bytes = b"LAYER3_AESCTR") -> Tuple[bytes, bytes]:
+        """
+        Derive AES-CTR key and IV the way 1.0 packages did (chained SHA-256)
         
-        # Initialize counter with derived value (not zero for additional security)
-        counter_init = struct.unpack('<I', iv_material[12:16])[0]
-        counter_bytes = struct.pack('<I', counter_init)
+        Args:
+            master_key: Master encryption key
+            nonce: Unique nonce for this operation
+            layer_id: Layer identifier for key separation
+            
+        Returns:
+            Tuple of (32-byte AES-256 key, 16-byte IV)
+        """
+        context = layer_id + nonce + b"AES256_CTR_KEY"
+        key_material = hashlib.sha256(master_key + context).digest()
+        ctr_key = hashlib.sha256(key_material + context[:16]).digest()
         
-        # Combine nonce and counter for full 16-byte IV
-        full_iv = ctr_nonce + counter_bytes
+        iv = hashlib.sha256(master_key + layer_id + nonce + b"CTR_IV_GENERATION").digest()[:16]
         
-        return full_iv
+        return ctr_key, iv
+    
+    @staticmethod
+    def _kdf_key(master_key: bytes) -> bytes:
+        """Hash a master key longer than BLAKE2b's 64-byte key limit down to 64 bytes"""
+        return hashlib.blake2b(master_key, person=b"LAYER3_LONGKEY").digest()
     
     def _create_ctr_cipher(self, key: bytes, iv: bytes) -> Cipher:
         """
@@ -108,18 +244,63 @@ class AESCTRLayer:
         Returns:
             Configured AES-CTR cipher
         """
-        # Extract nonce and initial counter from IV
-        nonce = iv[:12]
-        initial_value = struct.unpack('<I', iv[12:16])[0]
-        
-        # Create CTR mode with specified nonce and initial counter
-        ctr_mode = modes.CTR(nonce + struct.pack('<I', initial_value))
+        # The IV already is the full 16-byte counter block (nonce followed by
+        # the initial counter), so it goes to CTR mode unchanged
+        return Cipher(algorithms.AES(key), modes.CTR(iv), backend=self.backend)
+    
+    @classmethod
+    def _get_executor(cls):
+        """Shared shard pool, or None when there is only one CPU to run on"""
+        if cls._executor is None:
+            workers = os.cpu_count() or 1
+            if workers < 2:
+                return None
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=workers,
+                                                       thread_name_prefix="layer3-ctr")
+        return cls._executor
+    
+    def _apply_ctr(self, cipher: Cipher, key: bytes, iv: bytes, data: bytes) -> bytes:
+        """
+        Run data through the AES-CTR keystream (encryption and decryption are the same)
         
-        # Create cipher with AES-256 algorithm
-        algorithm = algorithms.AES(key)
-        cipher = Cipher(algorithm, ctr_mode, backend=self.backend)
+        Large payloads are split into shards whose sizes are multiples of the
+        16-byte block, so shard i starts at counter iv + offset // 16 and the
+        joined output is identical to a single pass.
         
-        return cipher
+        Args:
+            cipher: Configured AES-CTR cipher for key and iv
+            key: 32-byte AES-256 key
+            iv: 16-byte initial counter block
+            data: Plaintext or ciphertext
+            
+        Returns:
+            Transformed data
+        """
+        executor = self._get_executor() if len(data) >= self.PARALLEL_THRESHOLD else None
+        if executor is None:
+            # CTR finalize() never returns data; it is called only to close the context
+            context = cipher.encryptor()
+            output = context.update(data)
+            context.finalize()
+            return output
+            
+        shard_size = self.PARALLEL_SHARD_SIZE
+        view = memoryview(data).cast('B')
+        counter = int.from_bytes(iv, 'big')
+        
+        def process_shard(offset: int) -> bytes:
+            if offset:
+                shard_iv = ((counter + offset // 16) & _COUNTER_MASK).to_bytes(16, 'big')
+                context = self._create_ctr_cipher(key, shard_iv).encryptor()
+            else:
+                context = cipher.encryptor()
+            output = context.update(view[offset:offset + shard_size])
+            context.finalize()
+            return output
+            
+        return b"".join(executor.map(process_shard, range(0, len(view), shard_size)))
     
     def _pack_ctr_data(self, iv: bytes, ciphertext: bytes) -> bytes:
         """
@@ -130,26 +311,16 @@ class AESCTRLayer:
             ciphertext: Encrypted data
             
         Returns:
-            Packed data: [iv_length:1][iv][ciphertext_length:4][ciphertext]
+            Packed data: [iv:16][ciphertext]
         """
-        iv_len = len(iv)
-        ct_len = len(ciphertext)
-        
-        if iv_len != 16:
+        if len(iv) != 16:
             raise ValueError("IV must be exactly 16 bytes for AES-CTR")
-        if ct_len > 0xFFFFFFFF:
-            raise ValueError("Ciphertext too large (max 4GB)")
             
-        # Pack data with length prefixes
-        packed = bytearray()
-        packed.append(iv_len)  # 1 byte: IV length (should always be 16)
-        packed.extend(iv)      # 16 bytes: IV data
-        packed.extend(struct.pack('<I', ct_len))  # 4 bytes: ciphertext length
-        packed.extend(ciphertext)  # Variable: encrypted data
-        
-        return bytes(packed)
+        # The AES-CTR IV is always 16 bytes and the ciphertext runs to the end
+        # of the buffer, so no length fields are needed
+        return iv + ciphertext
     
-    def _unpack_ctr_data(self, packed_data: bytes) -> Tuple[bytes, bytes]:
+    def _unpack_ctr_data(self, packed_data: bytes) -> Tuple[bytes, memoryview]:
         """
         Unpack IV and ciphertext from data structure
         
@@ -157,28 +328,38 @@ class AESCTRLayer:
             packed_data: Packed data structure
             
         Returns:
-            Tuple of (iv, ciphertext)
+            Tuple of (16-byte IV as bytes, ciphertext as a memoryview into packed_data)
         """
-        if len(packed_data) < 21:  # Minimum: 1 + 16 + 4 = 21 bytes
+        if len(packed_data) < 16:  # Minimum: the 16-byte IV
             raise ValueError("Invalid packed data: too short")
             
-        # Extract IV
-        iv_len = packed_data[0]
-        if iv_len != 16:
-            raise ValueError(f"Invalid IV length: expected 16, got {iv_len}")
-            
-        iv = packed_data[1:17]  # Always 16 bytes for AES
-        
-        # Extract ciphertext length
-        ct_len = struct.unpack('<I', packed_data[17:21])[0]
+        # Fixed offsets: IV first, ciphertext is everything after it. The
+        # ciphertext stays a view so large payloads reach OpenSSL uncopied;
+        # only the 16-byte IV is materialized for the cipher mode
+        view = memoryview(packed_data)
+        return bytes(view[:16]), view[16:]
+    
+    def _unpack_legacy_ctr_data(self, packed_data: bytes) -> Tuple[bytes, memoryview]:
+        """
+        Unpack the 1.0 framing: [iv_length:1][iv:16][ciphertext_length:4][ciphertext]
         
-        # Extract ciphertext
+        Args:
+            packed_data: Packed data structure from a 1.0 package
+            
+        Returns:
+            Tuple of (16-byte IV as bytes, ciphertext as a memoryview into packed_data)
+        """
+        if len(packed_data) < 21:  # Minimum: 1 + 16 + 4 = 21 bytes
+            raise ValueError("Invalid packed data: too short")
+        if packed_data[0] != 16:
+            raise ValueError(f"Invalid IV length: expected 16, got {packed_data[0]}")
+            
+        ct_len = _U32.unpack_from(packed_data, 17)[0]
         if len(packed_data) < 21 + ct_len:
             raise ValueError("Invalid packed data: truncated ciphertext")
             
-        ciphertext = packed_data[21:21 + ct_len]
-        
-        return iv, ciphertext
+        view = memoryview(packed_data)
+        return bytes(view[1:17]), view[21:21 + ct_len]
     
     def encrypt(self, plaintext: bytes, master_key: bytes, nonce: bytes) -> bytes:
         """
@@ -199,25 +380,85 @@ class AESCTRLayer:
         if not plaintext:
             raise ValueError("Plaintext cannot be empty")
             
-        # Derive independent key for CTR layer
-        ctr_key = self._derive_ctr_key(master_key, nonce)
-        
-        # Generate secure IV for CTR mode
-        iv = self._generate_ctr_iv(master_key, nonce)
-        
-        # Create CTR cipher
-        cipher = self._create_ctr_cipher(ctr_key, iv)
-        encryptor = cipher.encryptor()
+        # Derive independent key, secure IV and CTR cipher (cached per key and nonce)
+        ctr_key, iv, cipher = self._derive_material(master_key, nonce)
         
         # Encrypt data (CTR mode doesn't need padding)
-        ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+        ciphertext = self._apply_ctr(cipher, ctr_key, iv, plaintext)
         
         # Pack IV and ciphertext
         packed_result = self._pack_ctr_data(iv, ciphertext)
         
         return packed_result
     
-    def decrypt(self, ciphertext: bytes, master_key: bytes, nonce: bytes) -> bytes:
+    def encrypt_small(self, plaintext: bytes, master_key: bytes, nonce: bytes) -> bytes:
+        """
+        Encrypt a short message without argument checks
+        
+        Produces the same output as encrypt(). For callers that already
+        guarantee a 32+ byte master key, a 16+ byte nonce and non-empty
+        plaintext (e.g. the 7-layer orchestrator), this skips the checks,
+        the parallel-shard dispatch and the packing helper. CTR finalize()
+        never returns data, so it is not called.
+        
+        Args:
+            plaintext: Non-empty data to encrypt
+            master_key: Master encryption key (32+ bytes)
+            nonce: Unique nonce for this operation (16+ bytes)
+            
+        Returns:
+            Packed CTR encrypted data with IV
+        """
+        ctr_key, iv, cipher = self._derive_material(master_key, nonce)
+        return iv + cipher.encryptor().update(plaintext)
+    
+    def encrypt_into(self, out, plaintext: bytes, master_key: bytes, nonce: bytes) -> int:
+        """
+        Encrypt plaintext and write the packed result into a caller-owned buffer
+        
+        CTR output is the same length as its input, so the packed result is
+        always 16 + len(plaintext) bytes. The ciphertext is written in place
+        by OpenSSL when the buffer allows it; some cryptography releases want
+        15 bytes of slack past the ciphertext for that, and without it the
+        ciphertext is copied in instead.
+        
+        Args:
+            out: Writable bytes-like object of at least 16 + len(plaintext) bytes
+            plaintext: Data to encrypt
+            master_key: Master encryption key (32+ bytes)
+            nonce: Unique nonce for this operation (16+ bytes)
+            
+        Returns:
+            Number of bytes written at the start of out
+        """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
+        if len(nonce) < 16:
+            raise ValueError("Nonce must be at least 16 bytes")
+        if not plaintext:
+            raise ValueError("Plaintext cannot be empty")
+            
+        view = memoryview(out).cast('B')
+        data_len = len(plaintext)
+        total_len = 16 + data_len
+        if view.nbytes < total_len:
+            raise ValueError(f"Output buffer too small: need {total_len} bytes, got {view.nbytes}")
+            
+        ctr_key, iv, cipher = self._derive_material(master_key, nonce)
+        encryptor = cipher.encryptor()
+        
+        # Packed layout: [iv:16][ciphertext]
+        view[:16] = iv
+        try:
+            encryptor.update_into(plaintext, view[16:])
+        except ValueError:
+            # Not enough slack for an in-place write on this cryptography version
+            view[16:total_len] = encryptor.update(plaintext)
+        encryptor.finalize()
+        
+        return total_len
+    
+    def decrypt(self, ciphertext: bytes, master_key: bytes, nonce: bytes, legacy: bool = False) -> bytes:
         """
         Decrypt ciphertext using AES-CTR stream decryption
         
@@ -225,6 +466,8 @@ class AESCTRLayer:
             ciphertext: Packed CTR encrypted data
             master_key: Master encryption key (must match encryption key)
             nonce: Nonce used during encryption (must match)
+            legacy: Data comes from a 1.0 package (SHA-256 key derivation,
+                    length-prefixed framing)
             
         Returns:
             Decrypted plaintext
@@ -236,62 +479,129 @@ class AESCTRLayer:
         if not ciphertext:
             raise ValueError("Ciphertext cannot be empty")
             
-        # Unpack IV and encrypted data
-        iv, encrypted_data = self._unpack_ctr_data(ciphertext)
+        # Unpack IV and encrypted data (1.0 packages carry length fields)
+        if legacy:
+            iv, encrypted_data = self._unpack_legacy_ctr_data(ciphertext)
+        else:
+            iv, encrypted_data = self._unpack_ctr_data(ciphertext)
         
-        # Derive same CTR key
-        ctr_key = self._derive_ctr_key(master_key, nonce)
+        # Derive same CTR key (and the cached cipher, valid when the IV matches)
+        ctr_key, derived_iv, cipher = self._derive_material(master_key, nonce, legacy)
         
         # Create CTR cipher with same IV
-        cipher = self._create_ctr_cipher(ctr_key, iv)
-        decryptor = cipher.decryptor()
+        if iv != derived_iv:
+            cipher = self._create_ctr_cipher(ctr_key, iv)
         
         # Decrypt data (CTR mode decryption is same as encryption)
-        plaintext = decryptor.update(encrypted_data) + decryptor.finalize()
+        plaintext = self._apply_ctr(cipher, ctr_key, iv, encrypted_data)
         
         return plaintext
     
-    def encrypt_stream(self, data_stream, master_key: bytes, nonce: bytes, chunk_size: int = 8192):
+    def encrypt_stream(self, data_stream, master_key: bytes, nonce: bytes, chunk_size: int = 65536):
         """
         Encrypt data in streaming fashion for large files
         
+        Small upstream chunks are collected until chunk_size bytes are
+        pending, so OpenSSL is called once per chunk_size rather than once
+        per producer chunk.
+        
         Args:
             data_stream: Iterable yielding data chunks
             master_key: Master encryption key (32+ bytes)
             nonce: Unique nonce for this operation (16+ bytes)
-            chunk_size: Size of chunks to process
+            chunk_size: Minimum number of bytes passed to each cipher call
             
         Yields:
-            Encrypted data chunks
+            The 16-byte IV, then encrypted data chunks. Concatenated, the
+            stream equals encrypt() output and can be read with decrypt_stream().
         """
         if len(master_key) < 32:
             raise ValueError("Master key must be at least 32 bytes")
         if len(nonce) < 16:
             raise ValueError("Nonce must be at least 16 bytes")
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be positive")
             
-        # Derive key and IV
-        ctr_key = self._derive_ctr_key(master_key, nonce)
-        iv = self._generate_ctr_iv(master_key, nonce)
-        
-        # Create cipher
-        cipher = self._create_ctr_cipher(ctr_key, iv)
+        # Derive key, IV and cipher
+        ctr_key, iv, cipher = self._derive_material(master_key, nonce)
         encryptor = cipher.encryptor()
         
         # Yield IV first
-        yield self._pack_ctr_data(iv, b'')[:21]  # Just header with IV
+        yield iv
         
-        # Process data stream
+        # Process data stream, batching small chunks
+        pending = bytearray()
         for chunk in data_stream:
-            if chunk:
-                encrypted_chunk = encryptor.update(chunk)
-                yield encrypted_chunk
+            if not chunk:
+                continue
+            if not pending and len(chunk) >= chunk_size:
+                # Already large enough: encrypt without copying into the buffer
+                yield encryptor.update(chunk)
+                continue
+            pending += chunk
+            if len(pending) >= chunk_size:
+                yield encryptor.update(pending)
+                pending.clear()
                 
+        if pending:
+            yield encryptor.update(pending)
+            
         # Finalize
         final_chunk = encryptor.finalize()
         if final_chunk:
             yield final_chunk
     
-    def get_stream_info(self, ciphertext: bytes) -> dict:
+    def decrypt_stream(self, data_stream, master_key: bytes, nonce: bytes):
+        """
+        Decrypt a stream produced by encrypt_stream (or split encrypt() output)
+        
+        Memory use stays at one input chunk regardless of total size.
+        
+        Args:
+            data_stream: Iterable yielding encrypted chunks of any size
+            master_key: Master encryption key (must match encryption key)
+            nonce: Nonce used during encryption (must match)
+            
+        Yields:
+            Decrypted data chunks
+        """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
+        if len(nonce) < 16:
+            raise ValueError("Nonce must be at least 16 bytes")
+            
+        header = b""
+        decryptor = None
+        
+        for chunk in data_stream:
+            if not chunk:
+                continue
+                
+            if decryptor is None:
+                # Collect the 16-byte IV, which may arrive split across chunks
+                header += chunk
+                if len(header) < 16:
+                    continue
+                iv, chunk = header[:16], header[16:]
+                
+                ctr_key, derived_iv, cipher = self._derive_material(master_key, nonce)
+                if iv != derived_iv:
+                    cipher = self._create_ctr_cipher(ctr_key, iv)
+                decryptor = cipher.decryptor()
+                
+                if not chunk:
+                    continue
+                    
+            yield decryptor.update(chunk)
+            
+        if decryptor is None:
+            raise ValueError("Invalid stream: missing IV header")
+            
+        final_chunk = decryptor.finalize()
+        if final_chunk:
+            yield final_chunk
+    
+    def get_stream_info(self, ciphertext: bytes) -> StreamInfo:
         """
         Get information about CTR encrypted stream
         
@@ -299,34 +609,40 @@ class AESCTRLayer:
             ciphertext: Packed CTR encrypted data
             
         Returns:
-            Dictionary with stream information
+            StreamInfo for the stream
+            
+        Raises:
+            ValueError: If the data is too short to hold the IV
         """
-        try:
-            iv, encrypted_data = self._unpack_ctr_data(ciphertext)
+        if len(ciphertext) < 16:
+            raise ValueError("Invalid packed data: too short")
             
-            # Extract counter information from IV
-            nonce = iv[:12]
-            initial_counter = struct.unpack('<I', iv[12:16])[0]
-            
-            # Calculate stream statistics
-            data_blocks = (len(encrypted_data) + 15) // 16  # 16-byte AES blocks
-            
-            return {
-                "iv_length": len(iv),
-                "nonce": nonce.hex(),
-                "initial_counter": initial_counter,
-                "data_length": len(encrypted_data),
-                "aes_blocks": data_blocks,
-                "overhead_bytes": len(ciphertext) - len(encrypted_data),
-                "is_stream": True,
-                "cipher_mode": "AES-256-CTR"
-            }
-            
-        except Exception as e:
-            return {
-                "error": str(e),
-                "is_valid": False
-            }
+        # Read the counter straight from the IV at its fixed offset
+        data_length = len(ciphertext) - 16
+        return StreamInfo(
+            bytes(ciphertext[:12]),
+            _U32.unpack_from(ciphertext, 12)[0],
+            data_length,
+            (data_length + 15) >> 4  # 16-byte AES blocks
+        )
+    
+    @staticmethod
+    def _hamming_distance(a: bytes, b: bytes) -> int:
+        """
+        Count differing bits between two equal-length byte strings
+        
+        Short inputs (keys, IVs) are XORed as single big integers and counted
+        with bin().count (int.bit_count needs Python 3.10). Longer inputs are
+        XORed and popcounted with NumPy.
+        """
+        if len(a) < _HAMMING_NUMPY_MIN:
+            diff = int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')
+            return bin(diff).count('1')
+            
+        diff = np.bitwise_xor(np.frombuffer(a, dtype=np.uint8), np.frombuffer(b, dtype=np.uint8))
+        if hasattr(np, 'bitwise_count'):
+            return int(np.bitwise_count(diff).sum(dtype=np.int64))
+        return int(_POPCOUNT_TABLE[diff].sum(dtype=np.int64))
     
     def verify_key_independence(self, master_key1: bytes, master_key2: bytes, nonce: bytes) -> dict:
         """
@@ -341,21 +657,18 @@ class AESCTRLayer:
             Dictionary with independence test results
         """
         # Derive keys from both master keys
-        key1 = self._derive_ctr_key(master_key1, nonce)
-        key2 = self._derive_ctr_key(master_key2, nonce)
+        key1, iv1 = self._derive_key_iv(master_key1, nonce)
+        key2, iv2 = self._derive_key_iv(master_key2, nonce)
         
         # Calculate Hamming distance (bit differences)
-        key_diff = sum(bin(b1 ^ b2).count('1') for b1, b2 in zip(key1, key2))
+        key_diff = self._hamming_distance(key1, key2)
         total_bits = len(key1) * 8
         
         # Good key derivation should have ~50% bit differences
         independence_ratio = key_diff / total_bits
         
         # Test IV independence
-        iv1 = self._generate_ctr_iv(master_key1, nonce)
-        iv2 = self._generate_ctr_iv(master_key2, nonce)
-        
-        iv_diff = sum(bin(b1 ^ b2).count('1') for b1, b2 in zip(iv1, iv2))
+        iv_diff = self._hamming_distance(iv1, iv2)
         iv_bits = len(iv1) * 8
         iv_independence = iv_diff / iv_bits
         
@@ -405,10 +718,10 @@ if __name__ == "__main__":
     # Test 2: Stream information
     stream_info = ctr_layer.get_stream_info(encrypted)
     print(f"\nStream Information:")
-    print(f"Cipher mode: {stream_info['cipher_mode']}")
-    print(f"AES blocks: {stream_info['aes_blocks']}")
-    print(f"Initial counter: {stream_info['initial_counter']}")
-    print(f"Overhead: {stream_info['overhead_bytes']} bytes")
+    print(f"Cipher mode: {stream_info.cipher_mode}")
+    print(f"AES blocks: {stream_info.aes_blocks}")
+    print(f"Initial counter: {stream_info.initial_counter}")
+    print(f"Overhead: {stream_info.overhead_bytes} bytes")
     
     # Test 3: Key independence
     master_key2 = secrets.token_bytes(32)
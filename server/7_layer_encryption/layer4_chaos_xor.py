@@ -12,6 +12,7 @@ Key Features:
 - HMAC-derived seed for reproducible chaos
 - IEEE 754 floating-point to byte conversion
 - Period detection and mitigation
+- 256 interleaved logistic-map lanes advanced together with NumPy
 
 Security Purpose:
 - Introduces nonlinear confusion impossible to analyze linearly
@@ -39,8 +40,16 @@ import hashlib
 import hmac
 import math
 import struct
-from typing import Iterator, Tuple
+from typing import Iterator, List, Sequence, Tuple
 import secrets
+import numpy as np
+
+# Seed word and length header, compiled once instead of per call
+_U64 = struct.Struct('<Q')
+_U32 = struct.Struct('<I')
+
+# Below this size one big-integer XOR beats NumPy's array setup cost
+_INT_XOR_MAX = 256
 
 
 class ChaosXORLayer:
@@ -52,8 +61,11 @@ class ChaosXORLayer:
     CHAOS_PARAMETER = 3.9999999999999996  # r value for logistic map
     
     # Security parameters
-    MIN_PERIOD_LENGTH = 1000000  # Minimum chaos sequence before re-seeding
+    MIN_PERIOD_LENGTH = 1000000  # Iterations per lane before re-seeding
+    CHAOS_LANES = 256  # Independent logistic maps interleaved into one stream
+    CHAOS_BLOCK_STEPS = 64  # Lane steps buffered before conversion (128 KiB of float states)
     FLOAT_TO_BYTE_SCALE = 255.0  # Scale factor for converting [0,1] to [0,255]
+    BATCH_STATE_BYTES = 4 * 1024 * 1024  # Float state budget per lock-step batch group
     
     def __init__(self):
         self.current_state = 0.0
@@ -78,7 +90,7 @@ class ChaosXORLayer:
         seed_hash = h.digest()
         
         # Convert first 8 bytes to IEEE 754 double precision
-        seed_int = struct.unpack('<Q', seed_hash[:8])[0]
+        seed_int = _U64.unpack_from(seed_hash)[0]
         
         # Normalize to (0, 1) range, avoiding 0 and 1 (chaos map boundaries)
         # Use double precision mantissa (53 bits) for maximum precision
@@ -114,21 +126,173 @@ class ChaosXORLayer:
             
         return next_x
     
-    def _chaos_to_byte(self, chaos_value: float) -> int:
+    def _states_from_material(self, material: bytes) -> np.ndarray:
         """
-        Convert chaos map output to byte value
+        Turn 8 bytes of hash output per lane into lane states in (0, 1)
         
         Args:
-            chaos_value: Floating-point value from logistic map [0, 1]
+            material: 8 * CHAOS_LANES bytes of hash output
             
         Returns:
-            Byte value in range [0, 255]
+            float64 array of CHAOS_LANES initial conditions
         """
-        # Scale to [0, 255] and round to nearest integer
-        byte_value = int(chaos_value * self.FLOAT_TO_BYTE_SCALE + 0.5)
+        # Keep the low 53 bits (exact in a double) and normalize to [0, 1)
+        states = (np.frombuffer(material, dtype='<u8') & ((1 << 53) - 1)) / float(1 << 53)
         
-        # Clamp to valid byte range (defensive programming)
-        return max(0, min(255, byte_value))
+        # 0 is a fixed point of the logistic map, so nudge it into the open interval
+        states[states == 0.0] = 1.0 / (1 << 53)
+        return states
+    
+    def _lane_seeds(self, seed: float) -> np.ndarray:
+        """
+        Expand one initial condition into independent per-lane initial conditions
+        
+        Args:
+            seed: Initial condition from _derive_chaos_seed
+            
+        Returns:
+            float64 array of CHAOS_LANES initial conditions
+        """
+        material = hashlib.shake_256(struct.pack('<d', seed) + b"CHAOS_LANES").digest(8 * self.CHAOS_LANES)
+        return self._states_from_material(material)
+    
+    def _reseed_lanes(self, states: np.ndarray, iteration: int) -> np.ndarray:
+        """
+        Re-derive all lane states to prevent periodic behavior
+        
+        Args:
+            states: Current lane states of the logistic map
+            iteration: Number of iterations each lane has run so far
+            
+        Returns:
+            New lane states in range (0, 1)
+        """
+        material = hashlib.shake_256(states.tobytes() + iteration.to_bytes(8, 'little')).digest(8 * self.CHAOS_LANES)
+        return self._states_from_material(material)
+    
+    def _fill_chaos(self, seed: float, length: int, data: bytes = None) -> np.ndarray:
+        """
+        Generate the chaotic keystream, optionally XORed with data, as a uint8 array
+        
+        CHAOS_LANES independent logistic maps, seeded from one expansion of
+        the initial condition, are stepped in lock-step as NumPy vectors; the
+        stream interleaves them (byte i comes from lane i % CHAOS_LANES). A
+        single map is strictly serial, so this is what lets one ufunc call
+        advance many bytes at once.
+        
+        Lane states are kept for CHAOS_BLOCK_STEPS steps at a time only; each
+        block is converted to bytes (and XORed with its slice of data) while
+        still in cache, so the float states never occupy stream-sized memory.
+        
+        Args:
+            seed: Initial condition for chaos map
+            length: Number of bytes to generate (> 0)
+            data: Optional input of exactly length bytes to XOR into the stream
+            
+        Returns:
+            uint8 array of length bytes
+        """
+        lanes = self.CHAOS_LANES
+        steps = -(-length // lanes)
+        block_steps = self.CHAOS_BLOCK_STEPS
+        block = np.empty((min(block_steps, steps), lanes), dtype=np.float64)
+        flat_block = block.reshape(-1)
+        scaled = np.empty(lanes, dtype=np.float64)
+        out = np.empty(length, dtype=np.uint8)
+        data_arr = np.frombuffer(data, dtype=np.uint8) if data is not None else None
+        r = self.CHAOS_PARAMETER
+        multiply, subtract = np.multiply, np.subtract
+        current = self._lane_seeds(seed)
+        
+        for seg_start in range(0, steps, self.MIN_PERIOD_LENGTH):
+            if seg_start:
+                current = self._reseed_lanes(current, seg_start)
+            seg_end = min(seg_start + self.MIN_PERIOD_LENGTH, steps)
+            
+            for block_start in range(seg_start, seg_end, block_steps):
+                rows = min(block_steps, seg_end - block_start)
+                # Branch-free inner loop: re-seed and block boundaries are
+                # handled by the enclosing loops
+                for row in block[:rows]:
+                    # x' = (r * x) * (1 - x), written straight into this step's row.
+                    # For x in (0, 1) and r < 4 the result stays in (0, 1), so the
+                    # scalar edge-case clamps are never needed here
+                    multiply(current, r, out=scaled)
+                    subtract(1.0, current, out=row)
+                    multiply(scaled, row, out=row)
+                    current = row
+                # Keep the last state: the block buffer is overwritten next round
+                current = current.copy()
+                
+                # Scale to [0, 255] and round half up in one cast. Lane values
+                # stay in (0, 1), so the result is always a valid byte
+                lo = block_start * lanes
+                hi = min(lo + rows * lanes, length)
+                values = flat_block[:hi - lo]
+                values *= self.FLOAT_TO_BYTE_SCALE
+                values += 0.5
+                dest = out[lo:hi]
+                np.copyto(dest, values, casting='unsafe')
+                if data_arr is not None:
+                    np.bitwise_xor(dest, data_arr[lo:hi], out=dest)
+                    
+        return out
+    
+    def _fill_chaos_batch(self, seeds: Sequence[float], lengths: Sequence[int]) -> List[np.ndarray]:
+        """
+        Generate keystreams for many messages, stepping all their lanes together
+        
+        Messages with the same number of lane steps are grouped, and each
+        group's lanes are concatenated into one wide vector, so a chat-sized
+        batch costs a handful of ufunc calls per step instead of a handful per
+        message per step. Each keystream equals _fill_chaos for its seed.
+        Messages long enough to need blocking or re-seeding use _fill_chaos.
+        
+        Args:
+            seeds: Initial condition per message
+            lengths: Keystream length per message (> 0)
+            
+        Returns:
+            uint8 keystream arrays in input order
+        """
+        lanes = self.CHAOS_LANES
+        streams = [None] * len(seeds)
+        groups = {}
+        for index, length in enumerate(lengths):
+            steps = -(-length // lanes)
+            if steps > self.CHAOS_BLOCK_STEPS:
+                streams[index] = self._fill_chaos(seeds[index], length)
+            else:
+                groups.setdefault(steps, []).append(index)
+                
+        r = self.CHAOS_PARAMETER
+        multiply, subtract = np.multiply, np.subtract
+        for steps, members in groups.items():
+            group_size = max(1, self.BATCH_STATE_BYTES // (steps * lanes * 8))
+            for start in range(0, len(members), group_size):
+                chunk = members[start:start + group_size]
+                width = len(chunk) * lanes
+                states = np.empty((steps, width), dtype=np.float64)
+                scaled = np.empty(width, dtype=np.float64)
+                current = np.concatenate([self._lane_seeds(seeds[index]) for index in chunk])
+                
+                for row in states:
+                    # Same lane step as _fill_chaos, over every message at once
+                    multiply(current, r, out=scaled)
+                    subtract(1.0, current, out=row)
+                    multiply(scaled, row, out=row)
+                    current = row
+                    
+                states *= self.FLOAT_TO_BYTE_SCALE
+                states += 0.5
+                # (step, message, lane) -> (message, step, lane): each message's
+                # bytes become contiguous in its lane-interleaved order
+                keystreams = states.astype(np.uint8).reshape(steps, len(chunk), lanes).transpose(1, 0, 2)
+                keystreams = keystreams.reshape(len(chunk), steps * lanes)
+                for position, index in enumerate(chunk):
+                    streams[index] = keystreams[position, :lengths[index]]
+                    
+        return streams
     
     def _generate_chaos_stream(self, seed: float, length: int) -> bytes:
         """
@@ -143,32 +307,57 @@ class ChaosXORLayer:
         """
         if length <= 0:
             return b""
+        return self._fill_chaos(seed, length).tobytes()
+    
+    def _generate_legacy_chaos_stream(self, seed: float, length: int) -> bytes:
+        """
+        Generate the single-map chaotic stream used by 1.0 packages
+        
+        One logistic map is iterated serially (no lanes) and re-seeded every
+        MIN_PERIOD_LENGTH bytes. Only decrypt(legacy=True) uses this.
+        
+        Args:
+            seed: Initial condition for chaos map
+            length: Number of bytes to generate
             
-        chaos_bytes = bytearray()
+        Returns:
+            Chaotic byte sequence
+        """
+        chaos_bytes = bytearray(length)
         current_state = seed
+        scale = self.FLOAT_TO_BYTE_SCALE
         
         for i in range(length):
-            # Check for period detection (re-seed if needed)
-            if i > 0 and i % self.MIN_PERIOD_LENGTH == 0:
-                # Re-derive seed to prevent periodic behavior
-                seed_bytes = struct.pack('<d', current_state)  # Current state as bytes
-                rehash = hashlib.sha256(seed_bytes + struct.pack('<Q', i)).digest()
-                seed_int = struct.unpack('<Q', rehash[:8])[0]
-                current_state = (seed_int & ((1 << 53) - 1)) / (1 << 53)
+            if i and i % self.MIN_PERIOD_LENGTH == 0:
+                # Re-derive the state from itself and the position
+                rehash = hashlib.sha256(struct.pack('<d', current_state) + _U64.pack(i)).digest()
+                current_state = (_U64.unpack_from(rehash)[0] & ((1 << 53) - 1)) / (1 << 53)
                 if current_state == 0.0:
                     current_state = 1e-15
                 elif current_state == 1.0:
                     current_state = 1.0 - 1e-15
-            
-            # Generate next chaotic value
+                    
             current_state = self._logistic_iterate(current_state)
-            
-            # Convert to byte and add to stream
-            chaos_byte = self._chaos_to_byte(current_state)
-            chaos_bytes.append(chaos_byte)
+            chaos_bytes[i] = max(0, min(255, int(current_state * scale + 0.5)))
             
         return bytes(chaos_bytes)
     
+    def _chaos_xor(self, data: bytes, seed: float) -> bytes:
+        """
+        XOR data with the chaotic stream for seed in a single pass
+        
+        Args:
+            data: Input data to XOR
+            seed: Initial condition for chaos map
+            
+        Returns:
+            XOR result
+        """
+        if len(data) <= _INT_XOR_MAX:
+            # Short inputs: NumPy setup would dominate the fused pass
+            return self._xor_with_chaos(data, self._generate_chaos_stream(seed, len(data)))
+        return self._fill_chaos(seed, len(data), data).tobytes()
+    
     def _xor_with_chaos(self, data: bytes, chaos_stream: bytes) -> bytes:
         """
         XOR data with chaotic stream
@@ -183,12 +372,16 @@ class ChaosXORLayer:
         if len(data) != len(chaos_stream):
             raise ValueError("Data and chaos stream must be same length")
             
-        # Perform XOR operation
-        result = bytearray()
-        for d_byte, c_byte in zip(data, chaos_stream):
-            result.append(d_byte ^ c_byte)
+        # Short inputs: XOR as two integers in one C-level operation
+        data_len = len(data)
+        if data_len <= _INT_XOR_MAX:
+            return (int.from_bytes(data, 'little') ^ int.from_bytes(chaos_stream, 'little')).to_bytes(data_len, 'little')
             
-        return bytes(result)
+        # Longer inputs: XOR the whole buffers in one vectorized pass
+        return np.bitwise_xor(
+            np.frombuffer(data, dtype=np.uint8),
+            np.frombuffer(chaos_stream, dtype=np.uint8)
+        ).tobytes()
     
     def _pack_chaos_data(self, seed_info: bytes, xor_result: bytes) -> bytes:
         """
@@ -208,15 +401,11 @@ class ChaosXORLayer:
             raise ValueError("Seed info too large (max 255 bytes)")
             
         # Pack: [seed_len:1][seed_info][data_len:4][xor_data]
-        packed = bytearray()
-        packed.append(seed_len)
-        packed.extend(seed_info)
-        packed.extend(struct.pack('<I', data_len))
-        packed.extend(xor_result)
-        
-        return bytes(packed)
+        # join sizes the result once and copies each part in a single pass,
+        # instead of growing a bytearray and copying it again into bytes
+        return b"".join((bytes((seed_len,)), seed_info, data_len.to_bytes(4, 'little'), xor_result))
     
-    def _unpack_chaos_data(self, packed_data: bytes) -> Tuple[bytes, bytes]:
+    def _unpack_chaos_data(self, packed_data: bytes) -> Tuple[bytes, memoryview]:
         """
         Unpack seed information and XOR result
         
@@ -224,28 +413,31 @@ class ChaosXORLayer:
             packed_data: Packed data structure
             
         Returns:
-            Tuple of (seed_info, xor_result)
+            Tuple of (seed_info, xor_result as a memoryview into packed_data)
         """
         if len(packed_data) < 6:  # Minimum: 1 + 1 + 4 = 6 bytes
             raise ValueError("Invalid packed data: too short")
             
+        # Slice through a view so the (possibly large) XOR section is not copied
+        view = memoryview(packed_data)
+        
         # Extract seed info
-        seed_len = packed_data[0]
-        if len(packed_data) < 1 + seed_len + 4:
+        seed_len = view[0]
+        if len(view) < 1 + seed_len + 4:
             raise ValueError("Invalid packed data: corrupted seed section")
             
-        seed_info = packed_data[1:1 + seed_len]
+        seed_info = bytes(view[1:1 + seed_len])
         
         # Extract data length
         data_len_start = 1 + seed_len
-        data_len = struct.unpack('<I', packed_data[data_len_start:data_len_start + 4])[0]
+        data_len = _U32.unpack_from(view, data_len_start)[0]
         
         # Extract XOR data
         xor_start = data_len_start + 4
-        if len(packed_data) < xor_start + data_len:
+        if len(view) < xor_start + data_len:
             raise ValueError("Invalid packed data: corrupted XOR section")
             
-        xor_result = packed_data[xor_start:xor_start + data_len]
+        xor_result = view[xor_start:xor_start + data_len]
         
         return seed_info, xor_result
     
@@ -271,11 +463,8 @@ class ChaosXORLayer:
         # Derive chaos seed
         chaos_seed = self._derive_chaos_seed(master_key, nonce)
         
-        # Generate chaotic stream matching plaintext length
-        chaos_stream = self._generate_chaos_stream(chaos_seed, len(plaintext))
-        
-        # XOR plaintext with chaos stream
-        xor_result = self._xor_with_chaos(plaintext, chaos_stream)
+        # Generate the chaotic stream and XOR plaintext into it in one pass
+        xor_result = self._chaos_xor(plaintext, chaos_seed)
         
         # Create seed derivation info for decryption (nonce is sufficient)
         seed_info = nonce[:16]  # First 16 bytes of nonce
@@ -285,13 +474,14 @@ class ChaosXORLayer:
         
         return packed_result
     
-    def decrypt(self, ciphertext: bytes, master_key: bytes) -> bytes:
+    def decrypt(self, ciphertext: bytes, master_key: bytes, legacy: bool = False) -> bytes:
         """
         Decrypt ciphertext using chaos-based XOR stream
         
         Args:
             ciphertext: Chaos-encrypted data
             master_key: Master encryption key (must match encryption key)
+            legacy: Data comes from a 1.0 package (single-map stream, no lanes)
             
         Returns:
             Decrypted plaintext
@@ -310,14 +500,88 @@ class ChaosXORLayer:
         # Derive same chaos seed
         chaos_seed = self._derive_chaos_seed(master_key, nonce)
         
-        # Generate same chaotic stream
-        chaos_stream = self._generate_chaos_stream(chaos_seed, len(xor_data))
-        
-        # XOR to decrypt (XOR is symmetric operation)
-        plaintext = self._xor_with_chaos(xor_data, chaos_stream)
+        # Generate same chaotic stream and XOR to decrypt (XOR is symmetric)
+        if legacy:
+            return self._xor_with_chaos(xor_data, self._generate_legacy_chaos_stream(chaos_seed, len(xor_data)))
+        plaintext = self._chaos_xor(xor_data, chaos_seed)
         
         return plaintext
     
+    def encrypt_batch(self, plaintexts: Sequence[bytes], master_key: bytes,
+                      nonces: Sequence[bytes]) -> List[bytes]:
+        """
+        Encrypt many messages under one master key in a single call
+        
+        The keystreams for all messages are generated together (see
+        _fill_chaos_batch); each result equals encrypt() for that message.
+        The keystream depends only on the key and nonce, so every message
+        needs its own nonce: a shared one would reuse the keystream.
+        
+        Args:
+            plaintexts: Messages to encrypt
+            master_key: Master encryption key (32+ bytes)
+            nonces: One distinct nonce per message
+            
+        Returns:
+            Chaos-encrypted messages in the same order as the input
+        """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
+        if isinstance(nonces, (bytes, bytearray)) or len(nonces) != len(plaintexts):
+            raise ValueError("Need one nonce per message")
+        # Only the first 16 bytes are packed and seed the keystream
+        if len({bytes(nonce[:16]) for nonce in nonces}) != len(nonces):
+            raise ValueError("Nonces must be unique within a batch")
+            
+        seeds = []
+        for plaintext, nonce in zip(plaintexts, nonces):
+            if len(nonce) < 16:
+                raise ValueError("Nonce must be at least 16 bytes")
+            if not plaintext:
+                raise ValueError("Plaintext cannot be empty")
+            seeds.append(self._derive_chaos_seed(master_key, nonce))
+            
+        streams = self._fill_chaos_batch(seeds, [len(plaintext) for plaintext in plaintexts])
+        
+        results = []
+        for plaintext, nonce, stream in zip(plaintexts, nonces, streams):
+            np.bitwise_xor(stream, np.frombuffer(plaintext, dtype=np.uint8), out=stream)
+            results.append(self._pack_chaos_data(nonce[:16], stream.tobytes()))
+            
+        return results
+    
+    def decrypt_batch(self, ciphertexts: Sequence[bytes], master_key: bytes) -> List[bytes]:
+        """
+        Decrypt many chaos-encrypted messages under one master key in a single call
+        
+        Args:
+            ciphertexts: Chaos-encrypted messages
+            master_key: Master encryption key (must match encryption key)
+            
+        Returns:
+            Decrypted plaintexts in the same order as the input
+        """
+        if len(master_key) < 32:
+            raise ValueError("Master key must be at least 32 bytes")
+            
+        payloads = []
+        seeds = []
+        for ciphertext in ciphertexts:
+            if not ciphertext:
+                raise ValueError("Ciphertext cannot be empty")
+            seed_info, xor_data = self._unpack_chaos_data(ciphertext)
+            payloads.append(xor_data)
+            seeds.append(self._derive_chaos_seed(master_key, seed_info))
+            
+        streams = self._fill_chaos_batch(seeds, [len(xor_data) for xor_data in payloads])
+        
+        plaintexts = []
+        for xor_data, stream in zip(payloads, streams):
+            np.bitwise_xor(stream, np.frombuffer(xor_data, dtype=np.uint8), out=stream)
+            plaintexts.append(stream.tobytes())
+            
+        return plaintexts
+    
     def analyze_chaos_quality(self, seed: float, length: int = 10000) -> dict:
         """
         Analyze the quality of chaotic sequence generation
@@ -332,14 +596,14 @@ class ChaosXORLayer:
         # Generate chaos sequence
         chaos_stream = self._generate_chaos_stream(seed, length)
         
+        arr = np.frombuffer(chaos_stream, dtype=np.uint8)
+        
         # Statistical analysis
-        byte_counts = [0] * 256
-        for byte_val in chaos_stream:
-            byte_counts[byte_val] += 1
-            
+        byte_counts = np.bincount(arr, minlength=256)
+        
         # Chi-square test for uniformity
         expected_count = length / 256
-        chi_square = sum((count - expected_count) ** 2 / expected_count for count in byte_counts)
+        chi_square = float(((byte_counts - expected_count) ** 2 / expected_count).sum())
         
         # Critical value for 255 degrees of freedom at 95% confidence ≈ 293.25
         chi_square_pass = chi_square < 293.25
@@ -347,20 +611,16 @@ class ChaosXORLayer:
         # Autocorrelation test (lag-1)
         autocorr = 0.0
         if length > 1:
-            mean_val = sum(chaos_stream) / length
-            numerator = sum((chaos_stream[i] - mean_val) * (chaos_stream[i+1] - mean_val) 
-                          for i in range(length - 1))
-            denominator = sum((byte_val - mean_val) ** 2 for byte_val in chaos_stream)
+            centered = arr - arr.mean()
+            numerator = float(np.dot(centered[:-1], centered[1:]))
+            denominator = float(np.dot(centered, centered))
             
             if denominator > 0:
                 autocorr = numerator / denominator
                 
         # Runs test for randomness
-        runs = 1
-        for i in range(1, length):
-            if chaos_stream[i] != chaos_stream[i-1]:
-                runs += 1
-                
+        runs = 1 + int(np.count_nonzero(arr[1:] != arr[:-1]))
+        
         expected_runs = 2 * length / 256 * (1 - 1/256)
         runs_quality = abs(runs - expected_runs) / expected_runs < 0.1
         
@@ -21,7 +21,7 @@ Security Purpose:
 - Provides defense against known-block attacks
 
 Implementation Details:
-- Uses HMAC for secure round count and swap derivation
+- Uses HMAC for secure round count and swap derivation (SHAKE128-expanded)
 - Processes data in 16-byte blocks (AES block size)
 - Handles arbitrary data lengths with padding
 - Constant-time operations to prevent timing attacks
@@ -33,6 +33,7 @@ import hmac
 import secrets
 import struct
 from typing import List, Tuple
+import numpy as np
 
 
 class RandomSwapper:
@@ -48,7 +49,7 @@ class RandomSwapper:
     def __init__(self):
         self.last_permutation = []  # Track last permutation for debugging
         
-    def _derive_swap_parameters(self, master_key: bytes, nonce: bytes, 
+    def _derive_swap_parameters(self, master_key: bytes, nonce: bytes, num_blocks: int = 0,
                                layer_id: bytes = b"LAYER5_SWAPPER") -> Tuple[int, bytes]:
         """
         Derive number of swap rounds and swap sequence from key material
@@ -56,10 +57,12 @@ class RandomSwapper:
         Args:
             master_key: Master encryption key
             nonce: Unique nonce for this operation
+            num_blocks: Number of blocks to be permuted (sizes swap_material)
             layer_id: Layer identifier for parameter separation
             
         Returns:
-            Tuple of (num_rounds, swap_material)
+            Tuple of (num_rounds, swap_material), where swap_material holds
+            exactly one 32-bit word per Fisher-Yates step of every round
         """
         # Create context for swap parameter derivation
         swap_context = layer_id + nonce + b"BLOCK_PERMUTATION"
@@ -72,19 +75,34 @@ class RandomSwapper:
         rounds_raw = struct.unpack('<I', param_hash[:4])[0]
         num_rounds = (rounds_raw % (self.MAX_ROUNDS - self.MIN_ROUNDS + 1)) + self.MIN_ROUNDS
         
-        # Generate additional random material for swaps
-        # Each round needs log2(blocks) random values on average
-        # Generate extra material to ensure we have enough
-        swap_material = param_hash  # Start with HMAC output
-        
-        # Extend swap material using key stretching
-        for i in range(8):  # Generate 8 additional hash blocks
-            extend_context = swap_context + struct.pack('<I', i)
-            h = hmac.new(master_key, extend_context, hashlib.sha256)
-            swap_material += h.digest()
+        # Expand the HMAC output into the swap material with one XOF call,
+        # sized so no round ever has to reuse material
+        material_length = num_rounds * max(num_blocks - 1, 0) * 4
+        xof = hashlib.shake_128(param_hash)
+        xof.update(b"SWAP_MATERIAL")
+        swap_material = xof.digest(material_length)
             
         return num_rounds, swap_material
     
+    def _derive_legacy_swap_material(self, master_key: bytes, nonce: bytes,
+                                     layer_id: bytes = b"LAYER5_SWAPPER") -> bytes:
+        """
+        Derive the fixed 288-byte swap material used by 1.0 packages
+        
+        Args:
+            master_key: Master encryption key
+            nonce: Unique nonce for this operation
+            layer_id: Layer identifier for parameter separation
+            
+        Returns:
+            The parameter HMAC followed by eight counter-mode HMAC blocks
+        """
+        swap_context = layer_id + nonce + b"BLOCK_PERMUTATION"
+        blocks = [hmac.digest(master_key, swap_context, 'sha256')]
+        for i in range(8):
+            blocks.append(hmac.digest(master_key, swap_context + struct.pack('<I', i), 'sha256'))
+        return b"".join(blocks)
+    
     def _pad_to_blocks(self, data: bytes) -> Tuple[bytes, int]:
         """
         Pad data to multiple of block size using PKCS#7 padding
@@ -135,100 +153,193 @@ class RandomSwapper:
         # Extract original data
         return padded_data[:original_length]
     
-    def _split_into_blocks(self, data: bytes) -> List[bytes]:
+    def _split_into_blocks(self, data: bytes) -> np.ndarray:
         """
-        Split data into fixed-size blocks
+        View data as fixed-size blocks without copying
         
         Args:
             data: Data to split (must be multiple of BLOCK_SIZE)
             
         Returns:
-            List of blocks
+            Array of BLOCK_SIZE-byte void items backed by data
         """
         if len(data) % self.BLOCK_SIZE != 0:
             raise ValueError(f"Data length must be multiple of {self.BLOCK_SIZE}")
             
-        blocks = []
-        for i in range(0, len(data), self.BLOCK_SIZE):
-            blocks.append(data[i:i + self.BLOCK_SIZE])
-            
-        return blocks
+        # One opaque item per block, so gathers move whole blocks with memcpy
+        return np.frombuffer(data, dtype=np.dtype((np.void, self.BLOCK_SIZE)))
     
-    def _join_blocks(self, blocks: List[bytes]) -> bytes:
+    def _join_blocks(self, blocks: np.ndarray) -> bytes:
         """
         Join blocks back into single byte string
         
         Args:
-            blocks: List of blocks to join
+            blocks: Block array from _split_into_blocks
             
         Returns:
             Concatenated data
         """
-        return b''.join(blocks)
+        return blocks.tobytes()
     
-    def _fisher_yates_shuffle(self, blocks: List[bytes], swap_material: bytes, 
-                             round_num: int) -> List[int]:
+    def _swap_indices(self, num_blocks: int, num_rounds: int, swap_material: bytes) -> List[List[int]]:
         """
-        Perform Fisher-Yates shuffle on blocks and return permutation indices
+        Compute the Fisher-Yates swap targets for every round in one pass
+        
+        The material is read as little-endian 32-bit words, one row per
+        round, and reduced modulo i + 1 for i = num_blocks - 1 down to 1.
         
         Args:
-            blocks: List of blocks to shuffle (modified in-place)
+            num_blocks: Number of blocks being shuffled (> 1)
+            num_rounds: Number of Fisher-Yates rounds
             swap_material: Random material for swap decisions
-            round_num: Current round number for material indexing
             
         Returns:
-            List of original indices (for inverse permutation)
+            Per round, the swap target j for each i, in shuffle order
         """
-        num_blocks = len(blocks)
-        if num_blocks <= 1:
-            return list(range(num_blocks))
+        steps = num_blocks - 1
+        words = np.frombuffer(swap_material, dtype='<u4', count=num_rounds * steps)
+        
+        divisors = np.arange(num_blocks, 1, -1, dtype=np.uint32)
+        return (words.reshape(num_rounds, steps) % divisors).tolist()
+    
+    def _legacy_swap_indices(self, num_blocks: int, num_rounds: int, swap_material: bytes) -> List[List[int]]:
+        """
+        Compute the Fisher-Yates swap targets the way 1.0 packages did
+        
+        Each round starts at offset (round * num_blocks * 4) modulo the
+        material length and wraps to the start when a word would run past
+        the end.
+        
+        Args:
+            num_blocks: Number of blocks being shuffled (> 1)
+            num_rounds: Number of Fisher-Yates rounds
+            swap_material: Material from _derive_legacy_swap_material
             
-        # Track permutation for inverse operation
-        indices = list(range(num_blocks))
+        Returns:
+            Per round, the swap target j for each i, in shuffle order
+        """
+        material_len = len(swap_material)
+        all_targets = []
+        for round_num in range(num_rounds):
+            offset = (round_num * num_blocks * 4) % material_len
+            targets = []
+            for i in range(num_blocks - 1, 0, -1):
+                if offset + 4 > material_len:
+                    offset = 0
+                targets.append(struct.unpack_from('<I', swap_material, offset)[0] % (i + 1))
+                offset += 4
+            all_targets.append(targets)
+        return all_targets
+    
+    def _fisher_yates_shuffle(self, indices: List[int], targets: List[int]) -> List[int]:
+        """
+        Run one Fisher-Yates round over a list of block indices
         
-        # Calculate offset into swap material for this round
-        material_offset = (round_num * num_blocks * 4) % len(swap_material)
+        Only indices are swapped; the caller moves the block data with one
+        gather (_apply_permutation), so no per-block objects are created.
         
+        Args:
+            indices: Block order to shuffle (modified in-place)
+            targets: This round's swap targets from _swap_indices
+            
+        Returns:
+            The shuffled indices: position i receives block indices[i]
+        """
         # Perform Fisher-Yates shuffle
-        for i in range(num_blocks - 1, 0, -1):
-            # Get random index from swap material
-            if material_offset + 4 > len(swap_material):
-                # Wrap around if we need more material
-                material_offset = 0
-                
-            random_bytes = swap_material[material_offset:material_offset + 4]
-            material_offset += 4
+        for i, j in zip(range(len(indices) - 1, 0, -1), targets):
+            indices[i], indices[j] = indices[j], indices[i]
             
-            random_int = struct.unpack('<I', random_bytes)[0]
-            j = random_int % (i + 1)  # Random index from 0 to i (inclusive)
+        return indices
+    
+    def _compose_permutation(self, num_blocks: int, num_rounds: int, swap_material: bytes) -> List[int]:
+        """
+        Compose all Fisher-Yates rounds into a single block permutation
+        
+        Every round shuffles the same index list, exactly as the rounds used
+        to shuffle the blocks themselves, so block data is moved only once.
+        
+        Args:
+            num_blocks: Number of blocks being permuted
+            num_rounds: Number of Fisher-Yates rounds
+            swap_material: Random material for swap decisions
             
-            # Swap blocks and track indices
-            blocks[i], blocks[j] = blocks[j], blocks[i]
-            indices[i], indices[j] = indices[j], indices[i]
+        Returns:
+            Final order: position i receives original block indices[i]
+        """
+        indices = list(range(num_blocks))
+        if num_blocks <= 1:
+            return indices
             
+        for targets in self._swap_indices(num_blocks, num_rounds, swap_material):
+            self._fisher_yates_shuffle(indices, targets)
         return indices
     
-    def _inverse_fisher_yates(self, blocks: List[bytes], permutation_indices: List[int]):
+    def _inverse_fisher_yates(self, blocks: np.ndarray, permutation_indices: List[int]) -> np.ndarray:
         """
         Apply inverse Fisher-Yates permutation to restore original order
         
         Args:
-            blocks: List of blocks to unpermute (modified in-place)
-            permutation_indices: Indices from forward permutation
+            blocks: Block array to unpermute
+            permutation_indices: Indices from the forward permutation
+            
+        Returns:
+            Block array in the order before the forward permutation
         """
-        num_blocks = len(blocks)
-        if num_blocks <= 1:
-            return
+        if len(blocks) <= 1:
+            return blocks
+            
+        # Scatter each block back to the position it was gathered from
+        restored = np.empty_like(blocks)
+        restored[self._index_array(permutation_indices)] = blocks
+        return restored
+    
+    def _apply_permutation(self, blocks: np.ndarray, permutation_indices: List[int]) -> np.ndarray:
+        """
+        Apply a forward Fisher-Yates permutation to a block array
+        
+        Args:
+            blocks: Block array to permute
+            permutation_indices: Indices from _compose_permutation
+            
+        Returns:
+            Block array where position i holds block permutation_indices[i]
+        """
+        return blocks[self._index_array(permutation_indices)]
+    
+    def _parse_legacy_permutations(self, permutation_info: bytes, num_rounds: int,
+                                   num_blocks: int) -> List[int]:
+        """
+        Compose the per-round permutations stored in 1.0 package metadata
+        
+        1.0 packages store [rounds:2] followed by every round's permutation
+        as num_blocks little-endian 16-bit indices.
+        
+        Args:
+            permutation_info: Permutation metadata from _unpack_swapped_data
+            num_rounds: Round count read from the metadata
+            num_blocks: Number of blocks being restored
+            
+        Returns:
+            Final order: position i receives original block indices[i]
+        """
+        count = num_rounds * num_blocks
+        if len(permutation_info) < 2 + count * 2:
+            raise ValueError("Invalid permutation info: truncated data")
             
-        # Create inverse mapping
-        inverse_indices = [0] * num_blocks
-        for i, orig_idx in enumerate(permutation_indices):
-            inverse_indices[orig_idx] = i
+        rounds = np.frombuffer(permutation_info, dtype='<u2', count=count, offset=2).reshape(num_rounds, num_blocks)
+        if count and int(rounds.max()) >= num_blocks:
+            raise ValueError("Invalid permutation info: index out of range")
             
-        # Apply inverse permutation
-        temp_blocks = blocks[:]  # Copy current state
-        for i in range(num_blocks):
-            blocks[i] = temp_blocks[inverse_indices[i]]
+        # Round r moved position i to rounds[r][i]; chain them into one gather
+        composed = np.arange(num_blocks)
+        for permutation in rounds:
+            composed = composed[permutation]
+        return composed.tolist()
+    
+    @staticmethod
+    def _index_array(indices: List[int]) -> np.ndarray:
+        """Convert a permutation list to an index array for gathers/scatters"""
+        return np.fromiter(indices, dtype=np.intp, count=len(indices))
     
     def _pack_swapped_data(self, swapped_blocks: bytes, original_length: int, 
                           permutation_data: bytes) -> bytes:
@@ -249,15 +360,11 @@ class RandomSwapper:
             raise ValueError("Permutation data too large (max 64KB)")
             
         # Pack: [orig_len:4][perm_len:2][perm_data][swapped_blocks]
-        packed = bytearray()
-        packed.extend(struct.pack('<I', original_length))  # 4 bytes: original length
-        packed.extend(struct.pack('<H', perm_len))         # 2 bytes: permutation length
-        packed.extend(permutation_data)                    # Variable: permutation data
-        packed.extend(swapped_blocks)                      # Variable: swapped blocks
-        
-        return bytes(packed)
+        # One join copies the block data once (no bytearray + bytes() round trip)
+        header = struct.pack('<IH', original_length, perm_len)
+        return b"".join((header, permutation_data, swapped_blocks))
     
-    def _unpack_swapped_data(self, packed_data: bytes) -> Tuple[bytes, int, bytes]:
+    def _unpack_swapped_data(self, packed_data: bytes) -> Tuple[memoryview, int, bytes]:
         """
         Unpack swapped blocks and metadata
         
@@ -265,25 +372,25 @@ class RandomSwapper:
             packed_data: Packed data structure
             
         Returns:
-            Tuple of (swapped_blocks, original_length, permutation_data)
+            Tuple of (swapped_blocks, original_length, permutation_data);
+            swapped_blocks is a zero-copy view into packed_data
         """
         if len(packed_data) < 6:  # Minimum: 4 + 2 = 6 bytes
             raise ValueError("Invalid packed data: too short")
             
-        # Extract original length
-        original_length = struct.unpack('<I', packed_data[:4])[0]
+        view = memoryview(packed_data)
         
-        # Extract permutation data length
-        perm_len = struct.unpack('<H', packed_data[4:6])[0]
+        # Extract original length and permutation data length
+        original_length, perm_len = struct.unpack_from('<IH', view)
         
         # Extract permutation data
-        if len(packed_data) < 6 + perm_len:
+        if len(view) < 6 + perm_len:
             raise ValueError("Invalid packed data: truncated permutation data")
             
-        permutation_data = packed_data[6:6 + perm_len]
+        permutation_data = bytes(view[6:6 + perm_len])
         
         # Extract swapped blocks
-        swapped_blocks = packed_data[6 + perm_len:]
+        swapped_blocks = view[6 + perm_len:]
         
         return swapped_blocks, original_length, permutation_data
     
@@ -306,40 +413,35 @@ class RandomSwapper:
         if not plaintext:
             raise ValueError("Plaintext cannot be empty")
             
-        # Derive swap parameters
-        num_rounds, swap_material = self._derive_swap_parameters(master_key, nonce)
-        
         # Pad data to block boundaries
         padded_data, original_length = self._pad_to_blocks(plaintext)
         
         # Split into blocks
         blocks = self._split_into_blocks(padded_data)
         
-        # Apply N rounds of Fisher-Yates permutations
-        all_permutations = []
-        for round_num in range(num_rounds):
-            permutation = self._fisher_yates_shuffle(blocks, swap_material, round_num)
-            all_permutations.append(permutation)
-            
-        # Store permutation history for debugging
-        self.last_permutation = all_permutations
+        # Derive swap parameters
+        num_rounds, swap_material = self._derive_swap_parameters(master_key, nonce, len(blocks))
+        
+        # Apply N rounds of Fisher-Yates permutations as one composed gather
+        permutation = self._compose_permutation(len(blocks), num_rounds, swap_material)
+        blocks = self._apply_permutation(blocks, permutation)
+        
+        # Store final permutation for debugging
+        self.last_permutation = permutation
         
         # Join blocks back together
         swapped_data = self._join_blocks(blocks)
         
-        # Encode permutation information
-        permutation_info = struct.pack('<H', num_rounds)  # Number of rounds
-        for perm in all_permutations:
-            # Encode each permutation as series of indices
-            for idx in perm:
-                permutation_info += struct.pack('<H', idx)
-                
+        # Only the round count is stored: the permutations themselves are
+        # deterministic from (master_key, nonce) and rebuilt on decryption
+        permutation_info = struct.pack('<H', num_rounds)
+        
         # Pack result with metadata
         packed_result = self._pack_swapped_data(swapped_data, original_length, permutation_info)
         
         return packed_result
     
-    def decrypt(self, ciphertext: bytes, master_key: bytes, nonce: bytes) -> bytes:
+    def decrypt(self, ciphertext: bytes, master_key: bytes, nonce: bytes, legacy: bool = False) -> bytes:
         """
         Reverse N-round block permutation from ciphertext
         
@@ -347,6 +449,7 @@ class RandomSwapper:
             ciphertext: Permuted data to restore
             master_key: Master encryption key (must match encryption key)
             nonce: Nonce used during encryption (must match)
+            legacy: Data comes from a 1.0 package (permutations stored in the metadata)
             
         Returns:
             Restored plaintext with original block order
@@ -373,28 +476,32 @@ class RandomSwapper:
             
         # Split swapped data into blocks
         blocks = self._split_into_blocks(swapped_data)
-        num_blocks = len(blocks)
         
-        # Parse all permutations
-        all_permutations = []
-        info_offset = 2
+        # Re-derive the swap parameters; the stored round count must agree
+        # (legacy packages need no swap material, only the round count)
+        expected_rounds, swap_material = self._derive_swap_parameters(
+            master_key, nonce, 0 if legacy else len(blocks))
+        if num_rounds != expected_rounds:
+            raise ValueError("Invalid permutation info: round count does not match key and nonce")
+            
+        if legacy:
+            # 1.0 packages carry every round's permutation after the round
+            # count; they must be the ones the 1.0 shuffle derives from the
+            # key and nonce, just as new packages are checked on the round count
+            permutation = self._parse_legacy_permutations(permutation_info, num_rounds, len(blocks))
+            expected = list(range(len(blocks)))
+            if len(blocks) > 1:
+                legacy_material = self._derive_legacy_swap_material(master_key, nonce)
+                for targets in self._legacy_swap_indices(len(blocks), num_rounds, legacy_material):
+                    self._fisher_yates_shuffle(expected, targets)
+            if permutation != expected:
+                raise ValueError("Invalid permutation info: permutations do not match key and nonce")
+        else:
+            # Rebuild the composed permutation by replaying the forward shuffle
+            # (it depends only on the block count), then undo it in one scatter
+            permutation = self._compose_permutation(len(blocks), num_rounds, swap_material)
+        blocks = self._inverse_fisher_yates(blocks, permutation)
         
-        for round_num in range(num_rounds):
-            if info_offset + (num_blocks * 2) > len(permutation_info):
-                raise ValueError("Invalid permutation info: truncated data")
-                
-            permutation = []
-            for block_idx in range(num_blocks):
-                idx = struct.unpack('<H', permutation_info[info_offset:info_offset + 2])[0]
-                permutation.append(idx)
-                info_offset += 2
-                
-            all_permutations.append(permutation)
-            
-        # Apply inverse permutations in reverse order
-        for round_num in range(num_rounds - 1, -1, -1):
-            self._inverse_fisher_yates(blocks, all_permutations[round_num])
-            
         # Join blocks and remove padding
         restored_data = self._join_blocks(blocks)
         plaintext = self._unpad_blocks(restored_data, original_length)
@@ -415,9 +522,6 @@ class RandomSwapper:
         Returns:
             Dictionary with permutation quality metrics
         """
-        # Generate test data
-        test_data = bytes(range(num_blocks * self.BLOCK_SIZE))
-        
         position_changes = []  # Track how far each block moves
         collision_counts = []  # Track position collisions
         
@@ -425,26 +529,22 @@ class RandomSwapper:
             # Use different nonce for each test
             test_nonce = nonce + struct.pack('<I', test_num)
             
-            # Encrypt (permute) test data
-            encrypted = self.encrypt(test_data, master_key, test_nonce)
+            # Derive and compose the rounds directly; no block data is needed
+            num_rounds, swap_material = self._derive_swap_parameters(master_key, test_nonce, num_blocks)
+            permutation = self._compose_permutation(num_blocks, num_rounds, swap_material)
             
-            # Analyze the permutation
-            if hasattr(self, 'last_permutation') and self.last_permutation:
-                final_positions = list(range(num_blocks))
-                
-                # Apply all rounds to see final position mapping
-                for round_perm in self.last_permutation:
-                    temp_positions = final_positions[:]
-                    for i, orig_pos in enumerate(round_perm):
-                        final_positions[orig_pos] = temp_positions[i]
+            # Map each block to its final position under the composed rounds
+            final_positions = list(range(num_blocks))
+            for i, orig_pos in enumerate(permutation):
+                final_positions[orig_pos] = i
                 
-                # Calculate position changes
-                changes = [abs(final_pos - orig_pos) for orig_pos, final_pos in enumerate(final_positions)]
-                position_changes.extend(changes)
-                
-                # Count position collisions (multiple blocks mapping to same position)
-                collisions = len(final_positions) - len(set(final_positions))
-                collision_counts.append(collisions)
+            # Calculate position changes
+            changes = [abs(final_pos - orig_pos) for orig_pos, final_pos in enumerate(final_positions)]
+            position_changes.extend(changes)
+            
+            # Count position collisions (multiple blocks mapping to same position)
+            collisions = len(final_positions) - len(set(final_positions))
+            collision_counts.append(collisions)
         
         # Calculate statistics
         avg_movement = sum(position_changes) / len(position_changes) if position_changes else 0
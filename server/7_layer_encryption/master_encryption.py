@@ -36,6 +36,7 @@ import struct
 import time
 import sys
 import os
+import threading
 from typing import Dict, Any, Optional, Tuple
 
 # Import the encryption logger
@@ -57,11 +58,21 @@ class SevenLayerEncryption:
     """
     
     # System configuration  
-    VERSION = "1.0"
+    VERSION = "1.1"
+    # Older package formats decrypt() still reads. Messages stored before 1.1
+    # use the 1.0 layer derivations and framing, selected per layer by legacy=True
+    LEGACY_VERSIONS = ("1.0",)
     MAGIC_HEADER = b"7LAYER"
     MASTER_KEY_SIZE = 64  # 512-bit master key for maximum entropy
     NONCE_SIZE = 32       # 256-bit nonce for cryptographic operations
     
+    # Shared entropy pool for nonces: one os.urandom() call serves 128 nonces.
+    # Class-level because callers build a new orchestrator for every message.
+    NONCE_POOL_SIZE = 4096
+    _nonce_pool = b""
+    _nonce_pool_offset = 0
+    _nonce_pool_lock = threading.Lock()
+    
     # Layer configuration profiles
     SECURITY_PROFILES = {
         "MAXIMUM": {
@@ -128,6 +139,30 @@ class SevenLayerEncryption:
         self.layer6 = NoiseEmbedder()
         self.layer7 = IntegrityTagger(tag_size=self.config["integrity_tag_size"])
     
+    @classmethod
+    def _next_nonce(cls) -> bytes:
+        """
+        Hand out the next unused nonce from the shared entropy pool
+        
+        Returns:
+            Fresh NONCE_SIZE-byte nonce
+        """
+        with cls._nonce_pool_lock:
+            start = cls._nonce_pool_offset
+            if start + cls.NONCE_SIZE > len(cls._nonce_pool):
+                # Pool exhausted - refill from the kernel CSPRNG
+                cls._nonce_pool = os.urandom(cls.NONCE_POOL_SIZE)
+                start = 0
+            cls._nonce_pool_offset = start + cls.NONCE_SIZE
+            return cls._nonce_pool[start:start + cls.NONCE_SIZE]
+    
+    @classmethod
+    def _reset_nonce_pool(cls):
+        """Discard pooled entropy so a forked child never reuses the parent's nonces"""
+        cls._nonce_pool = b""
+        cls._nonce_pool_offset = 0
+        cls._nonce_pool_lock = threading.Lock()
+    
     def _derive_layer_keys(self, master_key: bytes, nonce: bytes) -> Dict[int, bytes]:
         """
         Derive independent keys for each layer using secure key derivation
@@ -265,7 +300,7 @@ class SevenLayerEncryption:
         if master_key is None:
             master_key = secrets.token_bytes(self.MASTER_KEY_SIZE)
         if nonce is None:
-            nonce = secrets.token_bytes(self.NONCE_SIZE)
+            nonce = self._next_nonce()
             
         # Validate inputs
         if len(master_key) != self.MASTER_KEY_SIZE:
@@ -283,13 +318,16 @@ class SevenLayerEncryption:
         start_time = time.time()
         layer_timings = {}
         
+        # Layers take the first 16 nonce bytes; slice them once for the whole pass
+        layer_nonce = nonce[:16]
+        
         # Apply all 7 layers in sequence with detailed logging
         current_data = plaintext
         
         # Layer 1: Byte-Frequency Mask
         layer_start = time.time()
         input_data = current_data
-        current_data = self.layer1.encrypt(current_data, layer_keys[1], nonce[:16])
+        current_data = self.layer1.encrypt(current_data, layer_keys[1], layer_nonce)
         layer_timings[1] = time.time() - layer_start
         
         if operation_id:
@@ -301,7 +339,7 @@ class SevenLayerEncryption:
         # Layer 2: AES-Fernet
         layer_start = time.time()
         input_data = current_data
-        current_data = self.layer2.encrypt(current_data, layer_keys[2], nonce[:16])
+        current_data = self.layer2.encrypt(current_data, layer_keys[2], layer_nonce)
         layer_timings[2] = time.time() - layer_start
         
         if operation_id:
@@ -313,7 +351,12 @@ class SevenLayerEncryption:
         # Layer 3: AES-CTR
         layer_start = time.time()
         input_data = current_data
-        current_data = self.layer3.encrypt(current_data, layer_keys[3], nonce[:16])
+        # Keys, nonce and the (never empty) Layer 2 token are already valid here,
+        # so chat-sized payloads take the unchecked path
+        if len(current_data) < self.layer3.PARALLEL_THRESHOLD:
+            current_data = self.layer3.encrypt_small(current_data, layer_keys[3], layer_nonce)
+        else:
+            current_data = self.layer3.encrypt(current_data, layer_keys[3], layer_nonce)
         layer_timings[3] = time.time() - layer_start
         
         if operation_id:
@@ -325,7 +368,7 @@ class SevenLayerEncryption:
         # Layer 4: Chaos-XOR
         layer_start = time.time()
         input_data = current_data
-        current_data = self.layer4.encrypt(current_data, layer_keys[4], nonce[:16])
+        current_data = self.layer4.encrypt(current_data, layer_keys[4], layer_nonce)
         layer_timings[4] = time.time() - layer_start
         
         if operation_id:
@@ -337,7 +380,7 @@ class SevenLayerEncryption:
         # Layer 5: Random Swapper
         layer_start = time.time()
         input_data = current_data
-        current_data = self.layer5.encrypt(current_data, layer_keys[5], nonce[:16])
+        current_data = self.layer5.encrypt(current_data, layer_keys[5], layer_nonce)
         layer_timings[5] = time.time() - layer_start
         
         if operation_id:
@@ -349,7 +392,7 @@ class SevenLayerEncryption:
         # Layer 6: Noise Embedding
         layer_start = time.time()
         input_data = current_data
-        current_data = self.layer6.encrypt(current_data, layer_keys[6], nonce[:16])
+        current_data = self.layer6.encrypt(current_data, layer_keys[6], layer_nonce)
         layer_timings[6] = time.time() - layer_start
         
         if operation_id:
@@ -361,7 +404,7 @@ class SevenLayerEncryption:
         # Layer 7: Integrity Tag
         layer_start = time.time()
         input_data = current_data
-        current_data = self.layer7.encrypt(current_data, layer_keys[7], nonce[:16])
+        current_data = self.layer7.encrypt(current_data, layer_keys[7], layer_nonce)
         layer_timings[7] = time.time() - layer_start
         
         if operation_id:
@@ -403,9 +446,10 @@ class SevenLayerEncryption:
         # Parse system header
         version, profile, timestamp, nonce, header_length = self._parse_system_header(ciphertext)
         
-        # Verify compatibility
-        if version != self.VERSION:
+        # Verify compatibility (current format, or a legacy one we can still read)
+        if version != self.VERSION and version not in self.LEGACY_VERSIONS:
             raise ValueError(f"Version mismatch: expected {self.VERSION}, got {version}")
+        legacy = version in self.LEGACY_VERSIONS
         if profile != self.profile:
             # Auto-reconfigure if different profile
             old_profile = self.profile
@@ -424,6 +468,9 @@ class SevenLayerEncryption:
         start_time = time.time()
         layer_timings = {}
         
+        # Layers take the first 16 nonce bytes; slice them once for the whole pass
+        layer_nonce = nonce[:16]
+        
         # Apply all 7 layers in reverse order
         current_data = encrypted_data
         
@@ -434,32 +481,32 @@ class SevenLayerEncryption:
         
         # Layer 6: Noise Embedding (remove noise) - needs nonce
         layer_start = time.time()
-        current_data = self.layer6.decrypt(current_data, layer_keys[6], nonce[:16])
+        current_data = self.layer6.decrypt(current_data, layer_keys[6], layer_nonce)
         layer_timings[6] = time.time() - layer_start
         
         # Layer 5: Random Swapper (restore order) - needs nonce
         layer_start = time.time()
-        current_data = self.layer5.decrypt(current_data, layer_keys[5], nonce[:16])
+        current_data = self.layer5.decrypt(current_data, layer_keys[5], layer_nonce, legacy=legacy)
         layer_timings[5] = time.time() - layer_start
         
         # Layer 4: Chaos-XOR (remove chaos) - no nonce needed
         layer_start = time.time()
-        current_data = self.layer4.decrypt(current_data, layer_keys[4])
+        current_data = self.layer4.decrypt(current_data, layer_keys[4], legacy=legacy)
         layer_timings[4] = time.time() - layer_start
         
         # Layer 3: AES-CTR (decrypt stream) - needs nonce
         layer_start = time.time()
-        current_data = self.layer3.decrypt(current_data, layer_keys[3], nonce[:16])
+        current_data = self.layer3.decrypt(current_data, layer_keys[3], layer_nonce, legacy=legacy)
         layer_timings[3] = time.time() - layer_start
         
         # Layer 2: AES-Fernet (authenticated decrypt) - needs ttl parameter, not nonce
         layer_start = time.time()
-        current_data = self.layer2.decrypt(current_data, layer_keys[2])
+        current_data = self.layer2.decrypt(current_data, layer_keys[2], legacy=legacy)
         layer_timings[2] = time.time() - layer_start
         
         # Layer 1: Byte-Frequency Mask (restore original bytes) - needs nonce
         layer_start = time.time()
-        plaintext = self.layer1.decrypt(current_data, layer_keys[1], nonce[:16])
+        plaintext = self.layer1.decrypt(current_data, layer_keys[1], layer_nonce, legacy=legacy)
         layer_timings[1] = time.time() - layer_start
         
         # Update performance stats
@@ -565,6 +612,11 @@ class SevenLayerEncryption:
         print(f"Switched to {new_profile} profile")
 
 
+# A forked worker must not hand out nonces already pooled by its parent
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=SevenLayerEncryption._reset_nonce_pool)
+
+
 # Convenience functions for easy integration
 def encrypt_message(message: bytes, password: str = None, profile: str = "BALANCED") -> Tuple[bytes, bytes]:
     """
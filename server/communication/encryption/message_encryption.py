@@ -5,8 +5,12 @@ Handles end-to-end encryption and decryption of messages using 7-Layer Military-
 
 import base64
 import hashlib
+import logging
 import os
 import sys
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 
 # Import 7-layer encryption system
@@ -27,6 +31,8 @@ except ImportError as e:
     print(f"   📁 Tried path: {os.path.join(os.path.dirname(__file__), '..', '..', '7_layer_encryption')}")
     SEVEN_LAYER_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
 # Control verbose logging
 VERBOSE_LOGGING = os.getenv('CRYPTO_VERBOSE', 'true').lower() == 'true'
 
@@ -35,6 +41,48 @@ def debug_print(*args, **kwargs):
     if VERBOSE_LOGGING:
         print(*args, **kwargs)
 
+class MessageDecryptionError(ValueError):
+    """Raised when a stored message cannot be decrypted for a user pair"""
+
+# Derived conversation keys, keyed by a BLAKE2b fingerprint of the user
+# pair (never the user IDs themselves). Bounded in size and lifetime so raw
+# master keys do not sit in memory for the life of the process.
+CONVERSATION_KEY_CACHE_SIZE = 256
+CONVERSATION_KEY_TTL = 300  # seconds
+_conversation_keys = OrderedDict()
+_conversation_keys_lock = threading.Lock()
+
+def clear_conversation_key_cache():
+    """Drop every cached conversation key (e.g. on logout or key rotation)"""
+    with _conversation_keys_lock:
+        _conversation_keys.clear()
+
+def _derive_conversation_key(key_string):
+    """Run PBKDF2 once per conversation; both parties must derive the same key,
+    so the iteration count is fixed rather than calibrated per host"""
+    cache_key = hashlib.blake2b(key_string.encode(), digest_size=16, person=b"CONV_KEY").digest()
+    now = time.monotonic()
+    
+    with _conversation_keys_lock:
+        entry = _conversation_keys.get(cache_key)
+        if entry is not None:
+            master_key, expires = entry
+            if now < expires:
+                _conversation_keys.move_to_end(cache_key)
+                return master_key
+            del _conversation_keys[cache_key]
+    
+    # Derive outside the lock so one slow PBKDF2 does not block other conversations
+    master_key = hashlib.pbkdf2_hmac('sha256', key_string.encode(), b'7layer_msg_salt', 100000, 64)
+    
+    with _conversation_keys_lock:
+        _conversation_keys[cache_key] = (master_key, now + CONVERSATION_KEY_TTL)
+        _conversation_keys.move_to_end(cache_key)
+        if len(_conversation_keys) > CONVERSATION_KEY_CACHE_SIZE:
+            _conversation_keys.popitem(last=False)
+    
+    return master_key
+
 def generate_master_key_from_users(user1_id, user2_id):
     """Generate a consistent 64-byte master key for 7-layer encryption"""
     users = sorted([str(user1_id), str(user2_id)])
@@ -46,7 +94,8 @@ def generate_master_key_from_users(user1_id, user2_id):
         print(f"   📝 Key String: '{key_string}'")
     
     # Generate a 64-byte master key using PBKDF2 for 7-layer encryption
-    master_key = hashlib.pbkdf2_hmac('sha256', key_string.encode(), b'7layer_msg_salt', 100000, 64)
+    # (cached per user pair - every message in a conversation reuses it)
+    master_key = _derive_conversation_key(key_string)
     
     if VERBOSE_LOGGING:
         print(f"   🔐 Master Key (64 bytes): {master_key.hex()[:32]}...{master_key.hex()[-32:]}")
@@ -160,8 +209,6 @@ def decrypt_message(encrypted_data, user1_id, user2_id):
         return decrypted_message
         
     except Exception as e:
-        print(f"   ❌ 7-Layer Decryption Error: {e}")
-        # Return fallback for debugging - in production you might want to handle this differently
-        fallback_msg = encrypted_data if isinstance(encrypted_data, str) else encrypted_data.get('encrypted_message', 'DECRYPTION_FAILED')
-        print(f"   🔄 Returning fallback: {fallback_msg[:50]}...")
-        return fallback_msg
\ No newline at end of file
+        # Never hand ciphertext back as if it were plaintext - surface the failure
+        logger.exception("7-Layer decryption failed for users %s and %s", user1_id, user2_id)
+        raise MessageDecryptionError(f"Message decryption failed: {e}") from e
\ No newline at end of file
@@ -4,25 +4,39 @@ Handles encryption and decryption of files and images using Fernet (AES-128)
 Uses the same key derivation as message encryption for consistency
 """
 
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
 import base64
 import hashlib
 import binascii
 from datetime import datetime
+from functools import lru_cache
+
+# Optional Rust Fernet backend: same token format, far lower per-call overhead
+try:
+    import rfernet
+    RFERNET_AVAILABLE = True
+except ImportError:
+    RFERNET_AVAILABLE = False
+
+# Fernet tokens are already urlsafe-base64 text; older records wrapped them in a
+# second urlsafe-base64 layer, which always starts with this prefix
+LEGACY_DOUBLE_B64_PREFIX = b"Z0FBQUFB"
 
 def generate_file_key_from_users(user1_id, user2_id):
     """Generate a consistent encryption key for files between two users"""
-    users = sorted([str(user1_id), str(user2_id)])
-    key_string = f"FILE:{users[0]}:{users[1]}"  # Different namespace from messages
+    # Build the key material directly as bytes (UTF-8 preserves code point
+    # order, so sorting encoded ids matches sorting the strings)
+    user_a, user_b = sorted((str(user1_id).encode(), str(user2_id).encode()))
+    key_material = b"FILE:" + user_a + b":" + user_b  # Different namespace from messages
     
     print(f"\n🔑 FILE KEY GENERATION")
     print(f"   👥 Users: {user1_id} ↔ {user2_id}")
-    print(f"   📂 Key String: '{key_string}'")
-    print(f"   🔢 Key String (hex): {key_string.encode().hex()}")
+    print(f"   📂 Key String: '{key_material.decode()}'")
+    print(f"   🔢 Key String (hex): {key_material.hex()}")
     print(f"   🏷️ Namespace: FILE (separate from messages)")
     
     # Generate a key using SHA-256 and encode it for Fernet
-    key_hash = hashlib.sha256(key_string.encode()).digest()
+    key_hash = hashlib.sha256(key_material).digest()
     key_b64 = base64.urlsafe_b64encode(key_hash)
     
     print(f"   #️⃣ SHA-256 Hash (raw): {key_hash.hex()}")
@@ -31,6 +45,36 @@ def generate_file_key_from_users(user1_id, user2_id):
     
     return key_b64
 
+class _RustFernet:
+    """Adapter giving rfernet the bytes-in/bytes-out API of cryptography's Fernet"""
+    
+    def __init__(self, key):
+        self._fernet = rfernet.Fernet(key.decode() if isinstance(key, bytes) else key)
+    
+    def encrypt(self, data):
+        return self._fernet.encrypt(bytes(data)).encode()
+    
+    def decrypt(self, token):
+        try:
+            return self._fernet.decrypt(token.decode() if isinstance(token, bytes) else token)
+        except rfernet.DecryptionError as e:
+            raise InvalidToken() from e
+
+def build_fernet(key):
+    """Create a Fernet for the given key, preferring the Rust backend when installed"""
+    return _RustFernet(key) if RFERNET_AVAILABLE else Fernet(key)
+
+def get_file_fernet(user1_id, user2_id):
+    """Get the (key, Fernet) pair for two users, reusing it across files"""
+    users = sorted([str(user1_id), str(user2_id)])
+    return _cached_file_fernet(users[0], users[1])
+
+@lru_cache(maxsize=4096)
+def _cached_file_fernet(user_a, user_b):
+    """Derive the file key and build its Fernet once per (sorted) user pair"""
+    key = generate_file_key_from_users(user_a, user_b)
+    return key, build_fernet(key)
+
 def encrypt_file_data(file_data, user1_id, user2_id, filename="unknown"):
     """Encrypt file binary data between two users"""
     try:
@@ -46,12 +90,11 @@ def encrypt_file_data(file_data, user1_id, user2_id, filename="unknown"):
         print(f"   #️⃣ File SHA-256 Hash: {file_hash_full}")
         print(f"   #️⃣ Hash (short): {file_hash_short}")
         
-        key = generate_file_key_from_users(user1_id, user2_id)
-        fernet = Fernet(key)
+        key, fernet = get_file_fernet(user1_id, user2_id)
         
-        # Encrypt the binary file data
+        # Encrypt the binary file data (the Fernet token is already urlsafe Base64)
         encrypted_data = fernet.encrypt(file_data)
-        encrypted_b64 = base64.urlsafe_b64encode(encrypted_data).decode()
+        encrypted_b64 = encrypted_data.decode()
         
         print(f"   🔒 Encrypted (raw bytes): {encrypted_data[:30].hex()}{'...' if len(encrypted_data) > 30 else ''}")
         print(f"   🔒 Encrypted (Base64): {encrypted_b64[:80]}{'...' if len(encrypted_b64) > 80 else ''}")
@@ -107,13 +150,16 @@ def decrypt_file_data(encrypted_info, user1_id, user2_id):
         
         print(f"   🔒 Encrypted (Base64): {encrypted_data_b64[:80]}{'...' if len(encrypted_data_b64) > 80 else ''}")
         
-        # Decode Base64 to get raw encrypted bytes
-        encrypted_data = base64.urlsafe_b64decode(encrypted_data_b64.encode())
+        # The stored value is the Fernet token itself; unwrap the extra Base64
+        # layer that legacy records carry
+        encrypted_data = encrypted_data_b64.encode()
+        if encrypted_data.startswith(LEGACY_DOUBLE_B64_PREFIX):
+            print(f"   📊 Legacy double-Base64 token detected")
+            encrypted_data = base64.urlsafe_b64decode(encrypted_data)
         print(f"   🔒 Encrypted (raw bytes): {encrypted_data[:30].hex()}{'...' if len(encrypted_data) > 30 else ''}")
         print(f"   📏 Encrypted Size: {len(encrypted_data):,} bytes")
         
-        key = generate_file_key_from_users(user1_id, user2_id)
-        fernet = Fernet(key)
+        key, fernet = get_file_fernet(user1_id, user2_id)
         
         # Decrypt
         decrypted_data = fernet.decrypt(encrypted_data)
@@ -321,7 +367,7 @@ def migrate_existing_files_to_encryption(mongo, user1_id, user2_id, limit=10):
                         {"_id": file_doc["_id"]},
                         {
                             "$set": {
-                                "file_data": base64.b64decode(encryption_info['encrypted_data']),
+                                "file_data": base64.urlsafe_b64decode(encryption_info['encrypted_data']),
                                 "file_encryption": encryption_info,
                                 "is_encrypted": True,
                                 "migrated_at": datetime.utcnow()
@@ -103,7 +103,7 @@ def create_file_routes(app, mongo):
                 return jsonify({"msg": "File encryption failed", "status": False}), 500
             
             # Store encrypted file in MongoDB
-            encrypted_data = base64.b64decode(encryption_info['encrypted_data'])
+            encrypted_data = base64.urlsafe_b64decode(encryption_info['encrypted_data'])
             
             file_document = {
                 "filename": filename,
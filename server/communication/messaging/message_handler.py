@@ -5,8 +5,9 @@ Handles message storage, retrieval, and processing with encryption
 
 from flask import request, jsonify
 from bson.objectid import ObjectId
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from ..encryption.message_encryption import encrypt_message, decrypt_message
+from ..encryption.message_encryption import encrypt_message, decrypt_message, MessageDecryptionError
 from ..self_destruct.timer_handler import add_self_destruct_to_message
 
 # Import steganography system
@@ -16,6 +17,14 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'steganograp
 
 from seven_layer_stego import SevenLayerSteganography
 
+# Minimum history size before get_messages decrypts on a thread pool
+PARALLEL_DECRYPT_THRESHOLD = 16
+
+# One bounded pool shared by every get_messages request (created once, not per request)
+DECRYPT_POOL_WORKERS = min(4, os.cpu_count() or 1)
+_decrypt_executor = ThreadPoolExecutor(max_workers=DECRYPT_POOL_WORKERS,
+                                       thread_name_prefix="history-decrypt")
+
 # Create a custom crypto interface for steganography
 class CryptoInterface:
     """Interface to connect steganography with the existing 7-layer encryption system"""
@@ -137,11 +146,10 @@ def create_message_routes(app, mongo):
                 }
             }).sort("createdAt", 1)
             
-            project_messages = []
-            for msg in messages:
+            def project_message(msg):
                 if msg["message"].get("type") == "file":
                     # File message
-                    project_messages.append({
+                    return {
                         "fromSelf": str(msg["sender"]) == from_user,
                         "type": "file",
                         "file_id": str(msg["message"]["file_id"]),
@@ -149,36 +157,58 @@ def create_message_routes(app, mongo):
                         "original_filename": msg["message"]["original_filename"],
                         "file_type": msg["message"]["file_type"],
                         "file_size": msg["message"]["file_size"]
-                    })
+                    }
                 elif msg["message"].get("type") == "steganographic":
                     # Steganographic message - extract and decrypt
                     try:
                         innocent_text = msg["message"]["text"]
                         decrypted_text = stego_system.reveal_hidden_message(innocent_text, (from_user, to_user))
                         
-                        project_messages.append({
+                        return {
                             "fromSelf": str(msg["sender"]) == from_user,
                             "type": "steganographic",
                             "message": decrypted_text,
                             "innocent_text": innocent_text[:200] + "..." if len(innocent_text) > 200 else innocent_text,
                             "stego_info": msg.get("steganography_info", {})
-                        })
+                        }
                     except Exception as e:
                         # Fallback to showing innocent text if decryption fails
-                        project_messages.append({
+                        return {
                             "fromSelf": str(msg["sender"]) == from_user,
                             "type": "text",
                             "message": f"[Steganographic message - decryption failed: {str(e)}]"
-                        })
+                        }
                 else:
                     # Regular text message - decrypt it
-                    decrypted_text = decrypt_message(msg["message"]["text"], from_user, to_user)
+                    try:
+                        decrypted_text = decrypt_message(msg["message"]["text"], from_user, to_user)
+                    except MessageDecryptionError as e:
+                        # Keep the rest of the history readable if one message fails
+                        decrypted_text = f"[Encrypted message - decryption failed: {str(e)}]"
                     
-                    project_messages.append({
+                    return {
                         "fromSelf": str(msg["sender"]) == from_user,
                         "type": "text",
                         "message": decrypted_text
-                    })
+                    }
+            
+            # Decryption dominates this route, so larger histories spread their
+            # text messages over the shared pool (OpenSSL releases the GIL
+            # during AES). Steganographic reveals write to the encryption log,
+            # so they stay serial on this thread. Small batches stay serial too.
+            messages = list(messages)
+            if len(messages) >= PARALLEL_DECRYPT_THRESHOLD:
+                pending = [
+                    None if msg["message"].get("type") == "steganographic"
+                    else _decrypt_executor.submit(project_message, msg)
+                    for msg in messages
+                ]
+                project_messages = [
+                    project_message(msg) if future is None else future.result()
+                    for msg, future in zip(messages, pending)
+                ]
+            else:
+                project_messages = [project_message(msg) for msg in messages]
             
             return jsonify(project_messages)
         
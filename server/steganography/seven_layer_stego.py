@@ -105,8 +105,8 @@ class SevenLayerSteganography:
             # Log steganographic layer processing with actual innocent text
             if LOGGER_AVAILABLE:
                 # Create custom log entry showing the actual innocent text
-                with open(encryption_logger.log_file, 'a', encoding='utf-8') as f:
-                    f.write(f"""
+                # (through the shared logger so it stays in order with layers 1-7)
+                encryption_logger.write_entry(f"""
 LAYER 8: Steganographic Concealment
 {'─'*30}
 🎭 INNOCENT TEXT GENERATED:
@@ -195,8 +195,8 @@ LAYER 8: Steganographic Concealment
             # Log steganographic extraction with actual innocent text
             if LOGGER_AVAILABLE:
                 # Create custom log entry showing the innocent text that was processed
-                with open(encryption_logger.log_file, 'a', encoding='utf-8') as f:
-                    f.write(f"""
+                # (through the shared logger so it stays in order with layers 1-7)
+                encryption_logger.write_entry(f"""
 LAYER 8: Steganographic Extraction
 {'─'*30}
 🔍 PROCESSING INNOCENT TEXT: